@@ -1,3 +1,4 @@
+import numpy as np
 import dwave_networkx as dnx
 
 __all__ = ['dwave_coordinates']
@@ -26,6 +27,10 @@ class dwave_coordinates:
                 A single positive integer indexes the whole graph. Chimera and
                 Pegasus linear indices may coincide differ:
                     i.e. linear_to_chimera(int) != linear_to_pegasus(int)
+
+        Every conversion has an *_array version, which takes an array of N
+        linear indices, or an (N,4) or (N,5) array of coordinates, and returns
+        the converted array. The iter_* generators use these.
     """
     def __init__(self,*args,**kwargs):
         raise RuntimeError("Use classmethods {from_dwave_networkx, from_graph_dict}")
@@ -52,10 +57,28 @@ class dwave_coordinates:
     def from_dwave_networkx(cls, T):
         return cls.from_graph_dict(T.graph)
 
+def _as_index_array(labels, width):
+    """ Integer array of N labels, shape (N,) for linear indices or (N,width)
+        for coordinates.
+    """
+    array = np.asarray(labels if isinstance(labels, np.ndarray) else list(labels),
+                       dtype=np.int64)
+    return array.reshape(-1) if width == 1 else array.reshape(-1, width)
+
 class agnostic_coordinates:
-    """ To be inherited by <architecture>_coordinates """
+    """ To be inherited by <architecture>_coordinates. Conversions from and to
+        the family coordinates are bound once, instead of on every call.
+    """
     def __init__(self, family):
         self.family = family
+        for name in ['coordinate_to_linear', 'coordinate_to_nice',
+                     'linear_to_coordinate', 'nice_to_coordinate']:
+            source, target = name.split('_to_')
+            source = family if source == 'coordinate' else source
+            target = family if target == 'coordinate' else target
+            method = f'{source}_to_{target}'
+            setattr(self, name, getattr(self, method))
+            setattr(self, name + '_array', getattr(self, method + '_array'))
 
     def coordinate_to_linear(self, q):
         method = getattr(self, f'{self.family}_to_linear')
@@ -108,8 +131,36 @@ class agnostic_coordinates:
 class chimera_coordinates(agnostic_coordinates, dnx.chimera_coordinates):
     """ Augmented chimera_coordinates class """
     def __init__(self, m, n=None, t=None):
-        agnostic_coordinates.__init__(self, 'chimera')
         dnx.chimera_coordinates.__init__(self, m, n, t)
+        agnostic_coordinates.__init__(self, 'chimera')
+
+    def linear_to_chimera_array(self, r):
+        m, n, t = self.args
+        r = _as_index_array(r, 1)
+        r, k = np.divmod(r, t)
+        r, u = np.divmod(r, 2)
+        i, j = np.divmod(r, n)
+        return np.column_stack((i, j, u, k))
+
+    def chimera_to_linear_array(self, q):
+        m, n, t = self.args
+        i, j, u, k = _as_index_array(q, 4).T
+        return ((n*i + j)*2 + u)*t + k
+
+    @staticmethod
+    def chimera_to_nice_array(q):
+        q = _as_index_array(q, 4)
+        return np.column_stack((np.zeros(len(q), dtype=np.int64), q))
+
+    @staticmethod
+    def nice_to_chimera_array(n):
+        return _as_index_array(n, 5)[:,1:]
+
+    def linear_to_nice_array(self, r):
+        return self.chimera_to_nice_array(self.linear_to_chimera_array(r))
+
+    def nice_to_linear_array(self, n):
+        return self.chimera_to_linear_array(self.nice_to_chimera_array(n))
 
     def linear_to_nice(self, r):
         return self.chimera_to_nice(self.linear_to_chimera(r))
@@ -127,26 +178,80 @@ class chimera_coordinates(agnostic_coordinates, dnx.chimera_coordinates):
         return (i,j,u,k)
 
     def iter_linear_to_nice(self, rlist):
-        for r in rlist:
-            yield self.linear_to_nice(r)
+        yield from map(tuple, self.linear_to_nice_array(rlist).tolist())
 
     def iter_nice_to_linear(self, nlist):
-        for n in nlist:
-            yield self.nice_to_linear(n)
+        yield from self.nice_to_linear_array(nlist).tolist()
 
     @classmethod
     def iter_chimera_to_nice(cls, qlist):
-        for q in qlist:
-            yield (0,) + q
+        yield from map(tuple, cls.chimera_to_nice_array(qlist).tolist())
 
     @classmethod
     def iter_nice_to_chimera(cls, nlist):
-        for n in nlist:
-            t,i,j,u,k = n
-            yield (i,j,u,k)
+        yield from map(tuple, cls.nice_to_chimera_array(nlist).tolist())
 
 class pegasus_coordinates(agnostic_coordinates, dnx.pegasus_coordinates):
-    """ Augmented chimera_coordinates class """
+    """ Augmented pegasus_coordinates class """
     def __init__(self, m):
-        agnostic_coordinates.__init__(self, 'pegasus')
         dnx.pegasus_coordinates.__init__(self, m)
+        agnostic_coordinates.__init__(self, 'pegasus')
+
+    def linear_to_pegasus_array(self, r):
+        m, m1 = self.args
+        r = _as_index_array(r, 1)
+        r, z = np.divmod(r, m1)
+        r, k = np.divmod(r, 12)
+        u, w = np.divmod(r, m)
+        return np.column_stack((u, w, k, z))
+
+    def pegasus_to_linear_array(self, q):
+        m, m1 = self.args
+        u, w, k, z = _as_index_array(q, 4).T
+        return ((m*u + w)*12 + k)*m1 + z
+
+    @staticmethod
+    def pegasus_to_nice_array(p):
+        """ See dwave_networkx.pegasus_coordinates.pegasus_to_nice """
+        u, w, k, z = _as_index_array(p, 4).T
+        t = (2 - u - (2*u - 1)*(k//4)) % 3
+        vertical = u == 0
+        i = np.where(vertical, z, np.where(t == 2, w, w - 1))
+        j = np.where(vertical, np.where(t == 2, w - 1, w), z)
+        offset = np.choose(t, [np.full_like(k, 4),
+                               np.where(vertical, 8, 0),
+                               np.where(vertical, 0, 8)])
+        return np.column_stack((t, i, j, u, k - offset))
+
+    @staticmethod
+    def nice_to_pegasus_array(n):
+        """ See dwave_networkx.pegasus_coordinates.nice_to_pegasus """
+        t, y, x, u, k = _as_index_array(n, 5).T
+        vertical = u == 0
+        w = np.where(vertical, np.where(t == 2, x + 1, x),
+                     np.where(t == 2, y, y + 1))
+        offset = np.choose(t, [np.full_like(k, 4),
+                               np.where(vertical, 8, 0),
+                               np.where(vertical, 0, 8)])
+        z = np.where(vertical, y, x)
+        return np.column_stack((u, w, k + offset, z))
+
+    def linear_to_nice_array(self, r):
+        return self.pegasus_to_nice_array(self.linear_to_pegasus_array(r))
+
+    def nice_to_linear_array(self, n):
+        return self.pegasus_to_linear_array(self.nice_to_pegasus_array(n))
+
+    def iter_linear_to_nice(self, rlist):
+        yield from map(tuple, self.linear_to_nice_array(rlist).tolist())
+
+    def iter_nice_to_linear(self, nlist):
+        yield from self.nice_to_linear_array(nlist).tolist()
+
+    @classmethod
+    def iter_pegasus_to_nice(cls, plist):
+        yield from map(tuple, cls.pegasus_to_nice_array(plist).tolist())
+
+    @classmethod
+    def iter_nice_to_pegasus(cls, nlist):
+        yield from map(tuple, cls.nice_to_pegasus_array(nlist).tolist())
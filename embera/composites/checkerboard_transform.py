@@ -25,6 +25,8 @@ The gauge transformations are performed sequentially:
     -G: Checkered transformation    (spins flipped starting with shore 0)
 """
 
+import numpy as np
+
 from embera.architectures import dwave_coordinates
 
 from dimod.core.composite import Composite
@@ -122,15 +124,15 @@ class CheckerboardTransformComposite(Sampler, Composite, Structured):
         # Checkered transformation    (spins flipped starting with shore 0)
         # Inverse transformation      (spins flipped starting with shore 1)
         # Checkered transformation    (spins flipped starting with shore 0)
+        # Shore and tile parity of all variables, converted once
+        variables = list(bqm.variables)
+        nice = self.coordinates.linear_to_nice_array(variables)
+        is_even_tile = nice[:,:3].sum(axis=1)%2 == 0
+        shore = nice[:,3]
         for flip_even in [0, 1, 0]:
             # Create flipped BQM
-            for v in bqm:
-                t,i,j,u,k = self.coordinates.linear_to_nice(v)
-                tile = (t,i,j)
-                is_even_tile = not sum(tile)%2
-
-                flip = u==flip_even if is_even_tile else u!=flip_even
-
+            flips = np.where(is_even_tile, shore==flip_even, shore!=flip_even)
+            for v, flip in zip(variables, flips):
                 if flip:
                     transform[v] = not transform[v]
                     flipped_bqm.flip_variable(v)
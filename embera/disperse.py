@@ -8,38 +8,209 @@ in the resultant embedding is one of the provided candidates.
 
 import pulp
 import warnings
+import multiprocessing
 
+import numpy as np
 import networkx as nx
 import matplotlib.pyplot as plt
 
-from random import Random, shuffle
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import maximum_flow
+
+from time import perf_counter
+from random import Random
+from collections import deque
 from heapq import heappop, heappush
+from embera.interfaces.embedding import Embedding
+from embera.preprocess.tiling_parser import get_tiling
 
 __all__ = ["find_embedding"]
 
-# Routing cost scalers
-ALPHA_P = 0.0
-ALPHA_H = 0.0
+class _NetworkXTarget(object):
+    """ Target graph routing state kept as attributes of the NetworkX node
+    dicts. Node labels are used as they are in the target graph. Each router
+    run has its own state, including the routing cost scalers.
+    """
+    def __init__(self, Tg):
+        # Routing cost scalers
+        self.alpha_p = 0.0
+        self.alpha_h = 0.0
+
+        self.graph = Tg
+        for t_node, t_data in Tg.nodes(data=True):
+            # Fixed cost
+            t_data['degree'] = Tg.degree(t_node)
+            # BFS
+            t_data['history'] =  1.0
+            t_data['sharing'] = 0.0
+
+    def __len__(self):
+        return len(self.graph)
+
+    def index(self, t_nodes):
+        return t_nodes
+
+    def labels(self, paths, mapped, unassigned):
+        return paths, mapped, unassigned
+
+    def neighbors(self, t_node):
+        return self.graph[t_node]
+
+    def cost(self, t_node):
+        next_node = self.graph.nodes[t_node]
+
+        sharing_cost = 1.0 + next_node['sharing'] * self.alpha_p
+
+        scope_cost = 0.0 #TODO: higher if different tile
+
+        degree_cost = 0.0 #TODO: Use next_node['degree'] with ARCH max_degree
+
+        base_cost = 1.0 + degree_cost + scope_cost
+
+        history_cost = next_node['history']
+
+        return base_cost * sharing_cost * history_cost
+
+    def get_sharing(self, t_node):
+        return self.graph.nodes[t_node]['sharing']
+
+    def add_sharing(self, t_node, value):
+        self.graph.nodes[t_node]['sharing'] += value
+
+    def set_sharing(self, t_node, value):
+        self.graph.nodes[t_node]['sharing'] = value
+
+    def add_history(self, t_nodes, value):
+        for t_node in t_nodes:
+            self.graph.nodes[t_node]['history'] += value
+
+    def reset_sharing(self):
+        for t_node in self.graph:
+            self.graph.nodes[t_node]['sharing'] = 0.0
+
+    def negotiate(self, delta_p, delta_h):
+        """ Increase the present-sharing and history-sharing cost scalers. """
+        self.alpha_p += delta_p
+        self.alpha_h += delta_h
+
+    def refresh(self):
+        pass
+
+class _ArrayTarget(object):
+    """ Target graph relabelled to contiguous integers. Adjacency is held in
+    CSR form (indptr, indices) and the history and sharing costs in NumPy
+    arrays. Node indices follow the sorted order of the labels, if sortable,
+    so that ties in the priority queue break as with the original labels.
+    """
+    def __init__(self, Tg):
+        # Routing cost scalers
+        self.alpha_p = 0.0
+        self.alpha_h = 0.0
+
+        try:
+            t_labels = sorted(Tg)
+        except TypeError:
+            t_labels = list(Tg)
+        self.t_labels = t_labels
+        self.t_index = {t_node:i for i, t_node in enumerate(t_labels)}
+
+        # Compressed Sparse Row adjacency
+        indptr = [0]
+        indices = []
+        for t_node in t_labels:
+            indices.extend(self.t_index[v] for v in Tg[t_node])
+            indptr.append(len(indices))
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.indices = np.array(indices, dtype=np.int64)
+        self.degree = np.diff(self.indptr)
+        # Neighbour lists for scalar access during the search
+        self.adj = [self.indices[a:b].tolist() for a, b in
+                    zip(indptr[:-1], indptr[1:])]
+
+        num_nodes = len(t_labels)
+        self.history = np.ones(num_nodes)
+        self.sharing = np.zeros(num_nodes)
+        self.refresh()
+
+    def __len__(self):
+        return len(self.t_labels)
+
+    def index(self, t_nodes):
+        return [self.t_index[t_node] for t_node in t_nodes]
+
+    def labels(self, paths, mapped, unassigned):
+        t_labels = self.t_labels
+        paths = {edge:[t_labels[t] for t in path]
+                 for edge, path in paths.items()}
+        mapped = {s_node:set(t_labels[t] for t in s_map)
+                  for s_node, s_map in mapped.items()}
+        unassigned = {t_labels[t]:s_set for t, s_set in unassigned.items()}
+        return paths, mapped, unassigned
+
+    def neighbors(self, t_node):
+        return self.adj[t_node]
+
+    def cost(self, t_node):
+        return self.costs[t_node]
+
+    def get_sharing(self, t_node):
+        return self.sharing[t_node]
+
+    def add_sharing(self, t_node, value):
+        self.sharing[t_node] += value
+        sharing_cost = 1.0 + self.sharing[t_node] * self.alpha_p
+        self.costs[t_node] = float(sharing_cost * self.history[t_node])
+
+    def set_sharing(self, t_node, value):
+        self.add_sharing(t_node, value - self.sharing[t_node])
+
+    def add_history(self, t_nodes, value):
+        np.add.at(self.history, list(t_nodes), value)
+
+    def reset_sharing(self):
+        self.sharing.fill(0.0)
+
+    def negotiate(self, delta_p, delta_h):
+        """ Increase the present-sharing and history-sharing cost scalers. """
+        self.alpha_p += delta_p
+        self.alpha_h += delta_h
+
+    def refresh(self):
+        """ Recompute all node costs after a change of the cost scalers. """
+        self.costs = ((1.0 + self.sharing * self.alpha_p) * self.history).tolist()
 
 def _init_graphs(Sg, Tg, initial_chains, opts):
     """ Assign values to source and target graphs required for
-    the tree search.
+    the tree search. Returns the target routing state.
     """
+    if opts.engine == 'networkx':
+        target = _NetworkXTarget(Tg)
+    elif opts.engine == 'array':
+        target = _ArrayTarget(Tg)
+    else:
+        raise ValueError("engine %s not valid {'networkx', 'array'}." % opts.engine)
+
+    # Tile distance bound for the A* search
+    target.bound = _TileBound(Tg, target) if opts.steiner == 'astar' else None
+    # Routing profile
+    target.stats = RouterStats() if opts.profile else None
+
+    warm_start = opts.warm_start or {}
     for s_node, s_data in Sg.nodes(data=True):
         # Fixed data
         s_data['degree'] = Sg.degree(s_node)
         try:
-            s_data['candidates'] = initial_chains[s_node]
+            candidates = initial_chains[s_node]
         except KeyError:
-            raise KeyError('All source graph nodes require an initial'
-                            'chain of candidate target nodes.')
+            # Chain of the warm-start embedding, if any
+            candidates = warm_start.get(s_node, ())
+            if not candidates:
+                raise KeyError('All source graph nodes require an initial'
+                                'chain of candidate target nodes.')
+        # Candidates missing from the target graph (e.g. after a yield change)
+        s_data['candidates'] = target.index([t for t in candidates if t in Tg])
 
-    for t_node, t_data in Tg.nodes(data=True):
-        # Fixed cost
-        t_data['degree'] = Tg.degree(t_node)
-        # BFS
-        t_data['history'] =  1.0
-        t_data['sharing'] = 0.0
+    return target
 
 def _get_cost(neighbor, source, Tg, mapped={}, unassigned={}):
     """ The cost of using one target node is defined to depend on a base cost,
@@ -48,22 +219,10 @@ def _get_cost(neighbor, source, Tg, mapped={}, unassigned={}):
 
     if neighbor in mapped.get(source,set()):
         return 0.0
-    if neighbor in unassigned.get(source,set()):
+    if source in unassigned.get(neighbor,set()):
         return 1.0
 
-    next_node = Tg.nodes[neighbor]
-
-    sharing_cost = 1.0 + next_node['sharing'] * ALPHA_P
-
-    scope_cost = 0.0 #TODO: higher if different tile
-
-    degree_cost = 0.0 #TODO: Use next_node['degree'] with ARCH max_degree
-
-    base_cost = 1.0 + degree_cost + scope_cost
-
-    history_cost = next_node['history']
-
-    return base_cost * sharing_cost * history_cost
+    return Tg.cost(neighbor)
 
 def _bfs(source, sink_set, visited, visiting, queue, mapped, unassigned, Tg):
     """ Breadth-First Search
@@ -71,13 +230,14 @@ def _bfs(source, sink_set, visited, visiting, queue, mapped, unassigned, Tg):
 
     # Pop node out of Priority queue and its cost, parent, and distance.
     node_cost, node = heappop(queue)
+    pops = 1
     _, node_parent, node_dist = visiting[node]
     # Avoid search if source and sink are mapped to the same target node
     found = set([node]) == sink_set
     while (not found):
         neighbor_dist = node_dist + 1
         neighbor_parent = node
-        for neighbor in Tg[node]:
+        for neighbor in Tg.neighbors(node):
             if neighbor not in visited:
                 neighbor_cost = node_cost + _get_cost(neighbor, source, Tg, mapped, unassigned)
 
@@ -92,11 +252,13 @@ def _bfs(source, sink_set, visited, visiting, queue, mapped, unassigned, Tg):
         visited[node] = node_cost, node_parent, node_dist
         assert len(visited)!=len(Tg), "BFS traversed all the graph."
         node_cost, node = heappop(queue)
+        pops += 1
 
         _, node_parent, node_dist = visiting[node]
         found = node in sink_set
 
     visited[node] = node_cost, node_parent, node_dist
+    if Tg.stats: Tg.stats.search(pops + len(queue), pops, len(visited))
     return node
 
 def _traceback(source, sink, reached, visited, unassigned, mapped, Tg, opts):
@@ -107,11 +269,11 @@ def _traceback(source, sink, reached, visited, unassigned, mapped, Tg, opts):
 
     if sink not in mapped:
         mapped[sink] = set(path)
-        Tg.nodes[reached]['sharing'] += 1.0
+        Tg.add_sharing(reached, 1.0)
 
     _, node_parent, node_dist = visited[reached]
     if node_dist==1:
-        Tg.nodes[reached]['sharing'] += 1.0
+        Tg.add_sharing(reached, 1.0)
         return path
 
     node = node_parent
@@ -130,10 +292,10 @@ def _traceback(source, sink, reached, visited, unassigned, mapped, Tg, opts):
             else:
                 unassigned[node].add(source)
                 unassigned[node].add(sink)
-                Tg.nodes[node]['sharing'] += 1.0
+                Tg.add_sharing(node, 1.0)
         else:
             unassigned[node] = set([source, sink])
-            Tg.nodes[node]['sharing'] += 1.0
+            Tg.add_sharing(node, 1.0)
 
         _, node_parent, _ = visited[node]
         node = node_parent
@@ -183,6 +345,222 @@ def _steiner_tree(source, sinks, mapped, unassigned, Sg, Tg, opts):
         sink_set = _get_sink_set(sink, mapped, Sg)
         # BFS graph traversal
         reached = _bfs(source, sink_set, visited, visiting, queue, mapped, unassigned, Tg)
+        if Tg.stats: Tg.stats.reach(edge)
+        # Retrace steps from sink to source
+        path = _traceback(source, sink, reached, visited, unassigned, mapped, Tg, opts)
+        # Update tree
+        tree[edge] = path
+
+    return tree
+
+def _regrow(source, path, visited, queue, mapped, unassigned, Tg):
+    """ Once a path is traced back, its target nodes become part of the tree
+    grown from the source. Re-seed the queue with the nodes whose cost from the
+    tree improved, so that only the region around the new path is expanded.
+    """
+    parent_cost, parent_dist = 0.0, 0
+    for node in reversed(path[1:]):
+        if node in mapped[source]:
+            node_data = 0.0, source, 1
+        else:
+            node_cost = parent_cost + _get_cost(node, source, Tg, mapped, unassigned)
+            node_data = node_cost, path_parent, parent_dist + 1
+        if node_data[0] < visited[node][0]:
+            visited[node] = node_data
+            heappush(queue, (node_data[0], node))
+        parent_cost, _, parent_dist = visited[node]
+        path_parent = node
+
+def _multi_source_tree(source, sinks, mapped, unassigned, Sg, Tg, opts):
+    """ Multi-Source Steiner Tree Search
+    A single Dijkstra search grows one shortest-path tree from the target nodes
+    mapped to the source, and every sink is traced back as soon as one of its
+    target nodes is reached. Nodes are expanded again only if their cost
+    improves after the tree grows.
+    """
+    # Resulting tree dictionary keyed by edges and path values.
+    tree = {}
+    # Best (cost, parent, distance) found for each target node
+    visited = {}
+    # Cost of each target node when it was last expanded
+    closed = {}
+    # Priority Queue (cost, name)
+    queue = []
+    # Start search using previously-assigned nodes
+    _init_queue(source, visited, queue, mapped, Sg, Tg)
+    # Pending sinks indexed by their candidates, or nodes assigned to sink
+    sink_sets = {}
+    sink_index = {}
+    for sink in sinks:
+        sink_sets[sink] = set(_get_sink_set(sink, mapped, Sg))
+        for t_node in sink_sets[sink]:
+            sink_index.setdefault(t_node, []).append(sink)
+
+    pushes, pops, expanded = len(queue), 0, 0
+    while len(tree) < len(sinks):
+        assert queue, "Steiner search exhausted the target graph."
+        node_cost, node = heappop(queue)
+        pops += 1
+        best_cost, node_parent, node_dist = visited[node]
+        # Skip outdated queue entries, and nodes already expanded at this cost
+        if node_cost > best_cost: continue
+        if closed.get(node, float('inf')) <= node_cost: continue
+        closed[node] = node_cost
+
+        for sink in sink_index.get(node, []):
+            edge = (source,sink)
+            if edge in tree: continue
+            # Nodes mapped to the source only reach a sink that has no other
+            # target nodes to reach.
+            if node_dist==1 and not sink_sets[sink] <= mapped[source]: continue
+            if opts.verbose: print('########################## Edge %s' % str(edge))
+            path = _traceback(source, sink, node, visited, unassigned, mapped, Tg, opts)
+            tree[edge] = path
+            # Search effort since the previous sink was reached
+            queue_len = len(queue)
+            _regrow(source, path, visited, queue, mapped, unassigned, Tg)
+            if Tg.stats:
+                Tg.stats.search(pushes, pops, expanded)
+                Tg.stats.reach(edge)
+            pushes, pops, expanded = len(queue) - queue_len, 0, 0
+
+        expanded += 1
+        neighbor_dist = node_dist + 1
+        for neighbor in Tg.neighbors(node):
+            neighbor_cost = node_cost + _get_cost(neighbor, source, Tg, mapped, unassigned)
+            prev_cost, _, _ = visited.get(neighbor, (float('inf'),None,None))
+            if neighbor_cost < prev_cost:
+                visited[neighbor] = neighbor_cost, node, neighbor_dist
+                heappush(queue, (neighbor_cost, neighbor))
+                pushes += 1
+
+    return tree
+
+""" ########################### Bounded A* Search ########################### """
+
+class _TileBound(object):
+    """ Admissible lower bound on the number of target nodes in a path between
+    two tiles of a D-Wave NetworkX target graph. Every coupler moves at most
+    reach[axis] tiles along each axis, and on Chimera never along both axes.
+    As every target node costs at least 1.0, except those mapped to the source
+    node, the bound is also a lower bound of the path cost.
+    """
+    def __init__(self, Tg, target):
+        try:
+            tiling = get_tiling(Tg)
+        except KeyError:
+            raise ValueError("steiner 'astar' requires a dwave_networkx target graph.")
+
+        # Tile of each target node, as indexed by the target
+        t_nodes = list(Tg)
+        self.tile = dict(zip(target.index(t_nodes),
+                             (tiling.get_tile(q)[-2:] for q in t_nodes)))
+
+        reach_i, reach_j = 1, 1
+        self.manhattan = True
+        for u, v in Tg.edges:
+            (ui, uj), (vi, vj) = tiling.get_tile(u)[-2:], tiling.get_tile(v)[-2:]
+            reach_i = max(reach_i, abs(ui-vi))
+            reach_j = max(reach_j, abs(uj-vj))
+            if ui!=vi and uj!=vj: self.manhattan = False
+        self.reach = reach_i, reach_j
+
+    def tiles(self, t_nodes):
+        return set(self.tile[t_node] for t_node in t_nodes)
+
+    def lower(self, t_node, sink_tiles):
+        i, j = self.tile[t_node]
+        reach_i, reach_j = self.reach
+        bound = float('inf')
+        for ti, tj in sink_tiles:
+            hops_i = -(-abs(i-ti) // reach_i)
+            hops_j = -(-abs(j-tj) // reach_j)
+            hops = hops_i + hops_j if self.manhattan else max(hops_i, hops_j)
+            bound = min(bound, hops)
+        return bound
+
+    def window(self, tiles, radius):
+        """ Range of tiles within radius of the given tiles """
+        if radius is None: return None
+        rows, cols = zip(*tiles)
+        return (min(rows)-radius, max(rows)+radius,
+                min(cols)-radius, max(cols)+radius)
+
+    def inside(self, t_node, window):
+        if window is None: return True
+        i, j = self.tile[t_node]
+        i_min, i_max, j_min, j_max = window
+        return i_min <= i <= i_max and j_min <= j <= j_max
+
+def _astar(source, sink_set, visited, mapped, unassigned, Tg, window):
+    """ A* Search from the target nodes mapped to the source, guided by the
+    tile distance to the target nodes in the sink set. Target nodes outside
+    of the window are not expanded. Returns the reached target node, or None
+    if the sink set can't be reached within the window.
+    """
+    bound = Tg.bound
+    sink_tiles = bound.tiles(sink_set)
+    # Target nodes mapped to the source only reach a sink set within them
+    source_sink = sink_set <= mapped[source]
+
+    # Priority Queue (cost + bound, name)
+    queue = []
+    for node in mapped[source]:
+        visited[node] = 0.0, source, 1
+        heappush(queue, (bound.lower(node, sink_tiles), node))
+
+    pushes, pops = len(queue), 0
+    expanded = set()
+    reached = None
+    while queue:
+        _, node = heappop(queue)
+        pops += 1
+        if node in expanded: continue
+        expanded.add(node)
+
+        node_cost, _, node_dist = visited[node]
+        if node in sink_set and (node_dist > 1 or source_sink):
+            reached = node
+            break
+
+        neighbor_dist = node_dist + 1
+        for neighbor in Tg.neighbors(node):
+            if neighbor in expanded: continue
+            if not bound.inside(neighbor, window): continue
+            neighbor_cost = node_cost + _get_cost(neighbor, source, Tg, mapped, unassigned)
+            prev_cost, _, _ = visited.get(neighbor, (float('inf'),None,None))
+            if neighbor_cost < prev_cost:
+                visited[neighbor] = neighbor_cost, node, neighbor_dist
+                f_cost = neighbor_cost + bound.lower(neighbor, sink_tiles)
+                heappush(queue, (f_cost, neighbor))
+                pushes += 1
+
+    if Tg.stats: Tg.stats.search(pushes, pops, len(expanded))
+    return reached
+
+def _astar_tree(source, sinks, mapped, unassigned, Sg, Tg, opts):
+    """ Steiner Tree Search using a bounded A* search for every sink. If the
+    sink can't be reached within opts.radius tiles of the source and sink
+    tiles, the search is repeated without bounds.
+    """
+    # Resulting tree dictionary keyed by edges and path values.
+    tree = {}
+    if source not in mapped:
+        _embed_node(source, mapped, Sg, Tg)
+    for sink in sinks:
+        edge = (source,sink)
+        if opts.verbose: print('########################## Edge %s' % str(edge))
+        # Search for sink candidates, or nodes assigned to sink
+        sink_set = set(_get_sink_set(sink, mapped, Sg))
+        tiles = Tg.bound.tiles(sink_set.union(mapped[source]))
+        window = Tg.bound.window(tiles, opts.radius)
+        visited = {}
+        reached = _astar(source, sink_set, visited, mapped, unassigned, Tg, window)
+        if reached is None:
+            visited = {}
+            reached = _astar(source, sink_set, visited, mapped, unassigned, Tg, None)
+        assert reached is not None, "A* search exhausted the target graph."
+        if Tg.stats: Tg.stats.reach(edge)
         # Retrace steps from sink to source
         path = _traceback(source, sink, reached, visited, unassigned, mapped, Tg, opts)
         # Update tree
@@ -190,20 +568,28 @@ def _steiner_tree(source, sinks, mapped, unassigned, Sg, Tg, opts):
 
     return tree
 
-def _update_costs(mapped, Tg, opts):
+def _update_costs(paths, mapped, Tg, opts):
     """ Update present-sharing and history-sharing costs.
-    If a target node is shared, the embedding is not legal.
+    If a target node is shared, the embedding is not legal. This includes the
+    nodes in between source and sink of a path, shared with other paths.
+    Conflicts are the source nodes mapped to shared target nodes, and those
+    of the other paths crossing them.
     """
+    occupancy = {}
+    _occupy(paths, occupancy)
+    owners = _owners(mapped)
+    for s_node, s_map in mapped.items():
+        Tg.add_history(s_map, Tg.alpha_h)
 
-    legal = True
     conflicts = set()
-    for s_node, s_map in mapped.items():
-        for t_node in s_map:
-            Tg.nodes[t_node]['history'] += ALPHA_H
-            sharing =  Tg.nodes[t_node]['sharing']
-            if sharing > 1.0:
-                legal = False
-                conflicts.add(s_node)
+    congested = _get_congested(mapped, occupancy, Tg)
+    for t_node in congested:
+        t_owners = owners.get(t_node, set())
+        conflicts.update(t_owners)
+        for edge in occupancy.get(t_node, ()):
+            if t_owners.isdisjoint(edge):
+                conflicts.update(edge)
+    legal = not congested
 
     if opts.verbose: print('%s conflicts: %s' % ( len(conflicts), conflicts))
 
@@ -222,8 +608,7 @@ def _embed_node(source, mapped, Sg, Tg, opts={}):
     t_index = min( candidates, key=lambda t: _get_cost(t, source, Tg) )
 
     # Populate target node
-    t_node = Tg.nodes[t_index]
-    t_node['sharing'] += 1.0
+    Tg.add_sharing(t_index, 1.0)
     mapped[source] = set([t_index])
 
 def _rip_up(Sg, Tg, pending_set, paths, mapped, unassigned, conflicts):
@@ -231,22 +616,49 @@ def _rip_up(Sg, Tg, pending_set, paths, mapped, unassigned, conflicts):
     paths = { Sg edge : Tg nodes path }
     mapped = { Sg node: set(Tg nodes) }
     unassigned = { Tg node : set(Sg nodes) }
+    Sinks keep the target nodes used by their other paths, and their chains
+    are ripped up too if left disconnected. The sharing of released target
+    nodes is recomputed from the chains and paths left.
     """
-
-    for node in conflicts:
-        _ = mapped.pop(node, None)
-        for sink in Sg[node]:
-            edge = (node,sink) if (node,sink) in paths else (sink,node)
-            path = paths.pop(edge, [])
-            for t_node in path:
-                Tg.nodes[t_node]['sharing'] -= 1.0
-                t_set = unassigned.pop(t_node, set()) - set([node, sink])
-                if t_set: unassigned[t_node] = t_set
-
-            sink_set = mapped.pop(sink, set()) - set(path)
-            if sink_set: mapped[sink] = sink_set
-            pending_set.add(sink)
-        pending_set.add(node)
+    occupancy = {}
+    _occupy(paths, occupancy)
+    released = set()
+    ripped_nodes = set()
+    s_nodes = set(conflicts)
+    while s_nodes:
+        sinks = set()
+        for node in s_nodes:
+            released.update(mapped.pop(node, ()))
+            for sink in Sg[node]:
+                edge = (node,sink) if (node,sink) in paths else (sink,node)
+                path = paths.pop(edge, [])
+                for t_node in path:
+                    occupancy[t_node].discard(edge)
+                    if not occupancy[t_node]: del occupancy[t_node]
+                    released.add(t_node)
+                    t_set = unassigned.pop(t_node, set()) - set([node, sink])
+                    if t_set: unassigned[t_node] = t_set
+                # Nodes added to the sink chain by this path only
+                sink_set = mapped.pop(sink, set())
+                for t_node in path:
+                    if not any(sink in e for e in occupancy.get(t_node, ())):
+                        sink_set.discard(t_node)
+                if sink_set: mapped[sink] = sink_set
+                pending_set.add(sink)
+                sinks.add(sink)
+            pending_set.add(node)
+        ripped_nodes.update(s_nodes)
+
+        # Chains left disconnected are ripped up too
+        s_nodes = set()
+        for sink in sinks - ripped_nodes:
+            if not _is_connected(mapped.get(sink, ()), Tg):
+                s_nodes.add(sink)
+
+    # Sharing of released target nodes
+    owners = _owners(mapped)
+    for t_node in released:
+        Tg.set_sharing(t_node, float(_claims(t_node, owners, occupancy)))
 
 def _rip_all(Sg, Tg):
     """ Rip Up current embedding
@@ -260,21 +672,92 @@ def _rip_all(Sg, Tg):
     pending_set = set(Sg)
 
     # BFS
-    for t_node in Tg.nodes():
-        Tg.nodes[t_node]['sharing'] = 0.0
+    Tg.reset_sharing()
 
     return pending_set, paths, mapped, unassigned
 
-def _get_node(pending_set, pre_sel=[], opts={}):
-    """ Next node preferably in pre-selected nodes
+def _node_order(Sg, opts):
+    """ Order in which source nodes are selected for routing.
+        'random': Shuffled using the RNG of the router options.
+        'degree': Degree-descending.
+        'bfs': Breadth-first from the highest-degree node, visiting the
+            neighbours of each node in degree-descending order.
+    Ties are broken by the order of nodes in the source graph.
+    """
+    if opts.order == 'random':
+        order = list(Sg)
+        opts.rng.shuffle(order)
+    elif opts.order == 'degree':
+        order = sorted(Sg, key=Sg.degree, reverse=True)
+    elif opts.order == 'bfs':
+        order = []
+        visited = set()
+        # One search per connected component
+        for root in sorted(Sg, key=Sg.degree, reverse=True):
+            if root in visited: continue
+            visited.add(root)
+            queue = deque([root])
+            while queue:
+                node = queue.popleft()
+                order.append(node)
+                for neighbor in sorted(Sg[node], key=Sg.degree, reverse=True):
+                    if neighbor not in visited:
+                        visited.add(neighbor)
+                        queue.append(neighbor)
+    else:
+        raise ValueError("order %s not valid {'random', 'degree', 'bfs'}." % opts.order)
+    return order
+
+def _get_node(pending_set, order, rank, pre_sel=[]):
+    """ Next node preferably in pre-selected nodes, otherwise the next pending
+    node in the order iterator. Nodes are ranked by their position in the order.
+    """
+    pre_sel = [node for node in pre_sel if node in pending_set]
+    if pre_sel:
+        node = min(pre_sel, key=rank.get)
+    else:
+        node = next(node for node in order if node in pending_set)
+    pending_set.remove(node)
+    return node
+
+def _get_steiner_tree(opts):
+    """ Steiner tree search method selected in the router options """
+    if opts.steiner == 'sink':
+        return _steiner_tree
+    elif opts.steiner == 'multi':
+        return _multi_source_tree
+    elif opts.steiner == 'astar':
+        return _astar_tree
+    else:
+        raise ValueError("steiner %s not valid {'sink', 'multi', 'astar'}." % opts.steiner)
+
+def _route_pending(Sg, Tg, pending_set, paths, mapped, unassigned, opts):
+    """ Route all edges between pending source nodes without a path, starting
+    from the first pending node in the node order, and preferably continuing
+    through its sinks.
     """
-    shuffle(pre_sel)
-    for node in pre_sel:
-        if node in pending_set:
-            pending_set.remove(node)
-            return node
-    # Random if not
-    return pending_set.pop()
+    stats = Tg.stats
+    steiner_tree = _get_steiner_tree(opts)
+    # First node selection
+    start = perf_counter()
+    order = _node_order(Sg, opts)
+    rank = {s_node:i for i, s_node in enumerate(order)}
+    order = iter(order)
+    source = _get_node(pending_set, order, rank)
+    # Sinks of ripped up paths keep the rest of their chains
+    if source not in mapped: _embed_node(source, mapped, Sg, Tg, opts)
+    if stats: stats.time('select', start)
+    while pending_set:
+        # Edges kept by the rip-up are not routed again
+        sinks = [sink for sink in Sg[source] if sink in pending_set
+                 and (source,sink) not in paths and (sink,source) not in paths]
+        start = perf_counter()
+        tree = steiner_tree(source, sinks, mapped, unassigned, Sg, Tg, opts)
+        if stats: stats.time('steiner', start)
+        paths.update(tree)
+        start = perf_counter()
+        source = _get_node(pending_set, order, rank, pre_sel=sinks)
+        if stats: stats.time('select', start)
 
 def _route(Sg, Tg, opts):
     """ The disperse router uses a negotiated-congestion scheme, which is widely
@@ -283,8 +766,6 @@ def _route(Sg, Tg, opts):
     solution is found. A solution is legal when the occupancy of the qubits do
     not have conflicts.
     """
-    global ALPHA_P, ALPHA_H
-
     # Termination criteria
     legal = False
     tries = opts.tries
@@ -294,28 +775,299 @@ def _route(Sg, Tg, opts):
     unassigned = {}
     conflicts = set([])
     pending_set = set(Sg)
+    stats = Tg.stats
     while (not legal) and (tries > 0):
         if opts.verbose: print('############# TRIES LEFT: %s' % tries)
+        if stats: stats.new_try()
         # Route Rip Up
+        start = perf_counter()
         if opts.rip_all:
             pending_set, paths, mapped, unassigned = _rip_all(Sg, Tg)
         else:
             _rip_up(Sg, Tg, pending_set, paths, mapped, unassigned, conflicts)
-        # First node selection
-        source = _get_node(pending_set)
-        _embed_node(source, mapped, Sg, Tg, opts)
-        while pending_set:
-            sinks = [sink for sink in Sg[source] if sink in pending_set]
-            tree = _steiner_tree(source, sinks, mapped, unassigned, Sg, Tg, opts)
-            paths.update(tree)
-            source = _get_node(pending_set, pre_sel=sinks)
-        legal, conflicts = _update_costs(mapped, Tg, opts)
-        ALPHA_P += opts.delta_p
-        ALPHA_H += opts.delta_h
+        if stats: stats.time('rip', start)
+        # Costs with current scalers
+        start = perf_counter()
+        Tg.refresh()
+        if stats: stats.time('costs', start)
+        _route_pending(Sg, Tg, pending_set, paths, mapped, unassigned, opts)
+        start = perf_counter()
+        legal, conflicts = _update_costs(paths, mapped, Tg, opts)
+        Tg.negotiate(opts.delta_p, opts.delta_h)
+        if stats:
+            stats.time('costs', start)
+            stats.conflicts.append(len(conflicts))
+        tries -= 1
+
+    return legal, paths, mapped, unassigned
+
+""" ################### Incremental Negotiated Congestion ################### """
+
+def _occupy(tree, occupancy):
+    """ Add the paths of a tree to the occupancy index
+    occupancy = { Tg node : set(Sg edges) }
+    """
+    for edge, path in tree.items():
+        for t_node in path:
+            occupancy.setdefault(t_node, set()).add(edge)
+
+def _owners(mapped):
+    """ Inverse mapping of target nodes to the source nodes they are mapped to
+    owners = { Tg node : set(Sg nodes) }
+    """
+    owners = {}
+    for s_node, s_map in mapped.items():
+        for t_node in s_map:
+            owners.setdefault(t_node, set()).add(s_node)
+    return owners
+
+def _claims(t_node, owners, occupancy):
+    """ Number of source nodes, and of paths between other source nodes, that
+    use the target node. This is the sharing of a target node when traced back.
+    """
+    t_owners = owners.get(t_node, set())
+    claims = len(t_owners)
+    for edge in occupancy.get(t_node, ()):
+        if t_owners.isdisjoint(edge):
+            claims += 1
+    return claims
+
+def _get_congested(mapped, occupancy, Tg):
+    """ Target nodes used by more than one source node or path """
+    congested = set()
+    for t_node in set(occupancy).union(*mapped.values()):
+        if Tg.get_sharing(t_node) > 1.0:
+            congested.add(t_node)
+    return congested
+
+def _is_connected(t_nodes, Tg):
+    """ Whether a set of target nodes forms a connected chain """
+    if not t_nodes: return True
+    start = next(iter(t_nodes))
+    reached = set([start])
+    stack = [start]
+    while stack:
+        for neighbor in Tg.neighbors(stack.pop()):
+            if neighbor in t_nodes and neighbor not in reached:
+                reached.add(neighbor)
+                stack.append(neighbor)
+    return len(reached) == len(t_nodes)
+
+def _sorted_targets(t_nodes):
+    """ Target nodes in sorted order, or by representation if not sortable.
+    The indices of the array engine follow the sorted order of the labels.
+    """
+    try:
+        return sorted(t_nodes)
+    except TypeError:
+        return sorted(t_nodes, key=repr)
+
+def _rip_congested(Sg, Tg, congested, paths, mapped, unassigned, occupancy):
+    """ Rip up the paths crossing congested target nodes, and the chains of
+    source nodes mapped to the same target node, or left disconnected after
+    ripping up their paths. All other paths are kept.
+    Returns the edges to reroute. Sets are walked in the order of the target
+    nodes and of the source graph, so that the result doesn't depend on the
+    hash seed, and is the same for both engines.
+    """
+    # Ties are broken by the order of nodes in the source graph
+    rank = {s_node:i for i, s_node in enumerate(Sg)}
+    edge_key = lambda edge: (rank[edge[0]], rank[edge[1]])
+    owners = _owners(mapped)
+    ripped = set()
+    ripped_nodes = set()
+    released = set()
+    edges = set()
+    for t_node in _sorted_targets(congested):
+        edges.update(occupancy.get(t_node, ()))
+        t_owners = owners.get(t_node, set())
+        if len(t_owners) > 1:
+            ripped_nodes.update(t_owners)
+
+    s_nodes = set(ripped_nodes)
+    while s_nodes or edges:
+        # All edges of ripped source nodes, including those without paths
+        # between the chains of a warm start.
+        for s_node in sorted(s_nodes, key=rank.get):
+            for sink in Sg[s_node]:
+                if sink == s_node: continue
+                if (s_node,sink) in ripped or (sink,s_node) in ripped: continue
+                if (s_node,sink) in edges or (sink,s_node) in edges: continue
+                edge = (s_node,sink) if (s_node,sink) in paths else (sink,s_node)
+                edges.add(edge)
+
+        for edge in sorted(edges, key=edge_key):
+            path = paths.pop(edge, [])
+            for t_node in path:
+                occupancy[t_node].discard(edge)
+                if not occupancy[t_node]: del occupancy[t_node]
+                released.add(t_node)
+            # Nodes in between source and sink
+            for t_node in path[1:-1]:
+                if t_node in unassigned:
+                    t_set = unassigned.pop(t_node) - set(edge)
+                    if t_set: unassigned[t_node] = t_set
+                    continue
+                # Nodes added to a chain by this path, and not used by its others
+                for s_node in edge:
+                    s_edges = (e for e in occupancy.get(t_node,()) if s_node in e)
+                    if t_node in mapped.get(s_node,()) and not any(s_edges):
+                        mapped[s_node].discard(t_node)
+        ripped.update(edges)
+
+        # Chains left disconnected are ripped up too
+        s_nodes = set()
+        for s_node in set().union(*edges) - ripped_nodes:
+            if not _is_connected(mapped.get(s_node,()), Tg):
+                s_nodes.add(s_node)
+        ripped_nodes.update(s_nodes)
+        edges = set()
+
+    for s_node in ripped_nodes:
+        released.update(mapped.pop(s_node, ()))
+
+    # Sharing of released target nodes
+    owners = _owners(mapped)
+    for t_node in released:
+        Tg.set_sharing(t_node, float(_claims(t_node, owners, occupancy)))
+
+    return ripped
+
+def _reroute(Sg, Tg, ripped, paths, mapped, unassigned, occupancy, opts):
+    """ Reroute ripped edges, grouped by the source node with most of them. """
+    stats = Tg.stats
+    steiner_tree = _get_steiner_tree(opts)
+    # Ties are broken by the order of nodes in the source graph
+    rank = {s_node:i for i, s_node in enumerate(Sg)}
+    pending = {}
+    for u, v in sorted(ripped, key=lambda edge: (rank[edge[0]], rank[edge[1]])):
+        pending.setdefault(u, set()).add(v)
+        pending.setdefault(v, set()).add(u)
+    while pending:
+        start = perf_counter()
+        source = max(pending, key=lambda s_node: (len(pending[s_node]), -rank[s_node]))
+        sinks = sorted(pending.pop(source), key=rank.get)
+        for sink in sinks:
+            pending[sink].discard(source)
+            if not pending[sink]: del pending[sink]
+        if stats: stats.time('select', start)
+        start = perf_counter()
+        tree = steiner_tree(source, sinks, mapped, unassigned, Sg, Tg, opts)
+        if stats: stats.time('steiner', start)
+        paths.update(tree)
+        _occupy(tree, occupancy)
+
+def _warm_start(Sg, Tg, target, opts):
+    """ Seed the routing state with the chains of a prior embedding. Target
+    nodes missing from the target graph are dropped, and so are the parts of
+    a chain disconnected from its largest component. Returns the mapped target
+    nodes, and the source edges without a coupler between their chains.
+    """
+    mapped = {}
+    for s_node, chain in opts.warm_start.items():
+        if s_node not in Sg: continue
+        t_nodes = [t_node for t_node in chain if t_node in Tg]
+        if not t_nodes: continue
+        component = max(nx.connected_components(Tg.subgraph(t_nodes)), key=len)
+        mapped[s_node] = set(target.index(component))
+        for t_node in mapped[s_node]:
+            target.add_sharing(t_node, 1.0)
+
+    pending = set()
+    for u, v in Sg.edges:
+        if u == v: continue
+        if u in mapped and v in mapped:
+            v_map = mapped[v]
+            if any(t in v_map for t_node in mapped[u]
+                   for t in target.neighbors(t_node)): continue
+        pending.add((u,v))
+
+    return mapped, pending
+
+def _route_incremental(Sg, Tg, opts, warm_start=None):
+    """ Negotiated congestion in which only the paths crossing over-subscribed
+    target nodes are ripped up and rerouted after the first routing pass. A
+    per-target-node occupancy index of paths finds them without traversing
+    the embedding. Every try reports the number of congested target nodes.
+    If a warm start (mapped, pending) is given, the first pass only routes the
+    pending edges between the chains already mapped.
+    """
+    # Termination criteria
+    legal = False
+    tries = opts.tries
+    # Negotiated Congestion
+    paths = {}
+    mapped = {}
+    unassigned = {}
+    occupancy = {}
+    conflict_counts = []
+    stats = Tg.stats
+    # First pass routes all edges
+    if stats: stats.new_try()
+    Tg.refresh()
+    if warm_start is None:
+        _route_pending(Sg, Tg, set(Sg), paths, mapped, unassigned, opts)
+        _occupy(paths, occupancy)
+    else:
+        mapped, pending = warm_start
+        _reroute(Sg, Tg, pending, paths, mapped, unassigned, occupancy, opts)
+        for s_node in Sg:
+            if s_node not in mapped: _embed_node(s_node, mapped, Sg, Tg, opts)
+    tries -= 1
+    while True:
+        start = perf_counter()
+        congested = _get_congested(mapped, occupancy, Tg)
+        if stats: stats.time('costs', start)
+        conflict_counts.append(len(congested))
+        if opts.verbose: print('%s congested: %s' % (len(congested), congested))
+        legal = not congested
+        if legal or (tries <= 0): break
+        if opts.verbose: print('############# TRIES LEFT: %s' % tries)
+        if stats: stats.new_try()
+        start = perf_counter()
+        Tg.add_history(congested, Tg.alpha_h)
+        Tg.negotiate(opts.delta_p, opts.delta_h)
+        if stats: stats.time('costs', start)
+        # Rip up and reroute congested regions
+        start = perf_counter()
+        ripped = _rip_congested(Sg, Tg, congested, paths, mapped, unassigned, occupancy)
+        if stats: stats.time('rip', start)
+        start = perf_counter()
+        Tg.refresh()
+        if stats: stats.time('costs', start)
+        _reroute(Sg, Tg, ripped, paths, mapped, unassigned, occupancy, opts)
+        # Source nodes without edges left unmapped
+        for s_node in Sg:
+            if s_node not in mapped: _embed_node(s_node, mapped, Sg, Tg, opts)
         tries -= 1
 
+    if opts.verbose: print('Conflicts per try: %s' % conflict_counts)
+    if stats: stats.conflicts = conflict_counts
+
     return legal, paths, mapped, unassigned
 
+def _get_shared(edge, path, mapped):
+    """ Target nodes in between the source and sink of a path, excluding those
+    already mapped to either of them by the traceback of another path.
+    """
+    source, sink = edge
+    s_map, t_map = mapped[source], mapped[sink]
+    return [t_node for t_node in path[1:-1]
+            if t_node not in s_map and t_node not in t_map]
+
+def _assign_forced(paths, mapped):
+    """ Target nodes of a path in between its end and a node already mapped to
+    the same source node (or sink) can only be added to that chain, otherwise
+    the chain would be disconnected.
+    """
+    for (source, sink), path in paths.items():
+        s_map, t_map = mapped[source], mapped[sink]
+        # Path from traceback starts from sink
+        last_t = max((i for i, t_node in enumerate(path) if t_node in t_map), default=0)
+        first_s = min((i for i, t_node in enumerate(path) if t_node in s_map), default=len(path)-1)
+        if last_t < first_s:
+            t_map.update(path[1:last_t])
+            s_map.update(path[first_s+1:-1])
 
 def _setup_lp(paths, mapped, unassigned):
     """ Setup linear Programming Problem
@@ -357,7 +1109,7 @@ def _setup_lp(paths, mapped, unassigned):
     # Create variables per path to select unassigned nodes
     for edge, path in paths.items():
         # Nodes in path excluding source and sink
-        shared = len(path) - 2
+        shared = len(_get_shared(edge, path, mapped))
         if shared > 0:
             # PuLP variable names do not support spaces
             s_name, t_name = (str(x).replace(" ","") for x in edge)
@@ -380,33 +1132,133 @@ def _setup_lp(paths, mapped, unassigned):
 
     return lp, var_map
 
-def _assign_nodes(paths, lp_sol, var_map, mapped):
+def _solve_lp(paths, mapped, unassigned, opts):
+    """ Solve the linear program using GLPK, and return the number of target
+    nodes in each path that are added to the sink.
+    """
+    lp, var_map = _setup_lp(paths, mapped, unassigned)
+
+    if opts.verbose==2: lp.writeLP("SHARING.lp")
+
+    lp.solve(solver=pulp.GLPK_CMD(msg=opts.verbose))
+
+    # read solution
+    lp_sol = {}
+    for v in  lp.variables():
+        lp_sol[v.name] = v.varValue
+
+    num_sink = {}
+    for edge, names in var_map.items():
+        _, sink = edge
+        num_sink[edge] = lp_sol[names[str(sink).replace(" ","")]]
+
+    return num_sink
+
+def _flow_split(demand, load, Z):
+    """ Feasibility of a maximum chain length Z as a maximum-flow problem. Each
+    path supplies its shared target nodes to either of its two source nodes,
+    and each source node takes at most Z minus its mapped target nodes.
+    Returns the number of shared target nodes added to each sink, or None.
+    """
+    if any(s_load > Z for s_load in load.values()): return None
+
+    # Flow network: 0 is the source, 1 the sink, then paths and source nodes
+    edges = list(demand)
+    s_index = {s_node:2+len(edges)+i for i, s_node in enumerate(load)}
+    rows, cols, capacity = [], [], []
+    for i, edge in enumerate(edges, 2):
+        shared = demand[edge]
+        rows += [0, i, i]
+        cols += [i, s_index[edge[0]], s_index[edge[1]]]
+        capacity += [shared, shared, shared]
+    for s_node, s_load in load.items():
+        rows.append(s_index[s_node])
+        cols.append(1)
+        capacity.append(Z-s_load)
+
+    size = 2 + len(edges) + len(load)
+    G = csr_matrix((np.array(capacity, dtype=np.int32), (rows, cols)),
+                   shape=(size, size))
+    result = maximum_flow(G, 0, 1)
+    if result.flow_value < sum(demand.values()): return None
+
+    # Named residual in SciPy < 1.8
+    flow = getattr(result, 'flow', None)
+    if flow is None: flow = result.residual
+    flow = flow.tocsr()
+
+    return {edge:int(flow[i, s_index[edge[1]]]) for i, edge in enumerate(edges, 2)}
+
+def _split_paths(paths, mapped, opts):
+    """ Min-max splitting of the shared target nodes in every path between its
+    source and sink. A greedy split that balances the two chains of each path,
+    longest paths first, gives an upper bound of the maximum chain length. If
+    it does not meet the lower bound, the optimum is found by bisection on Z,
+    using a maximum-flow feasibility check.
+    """
+    demand = {}
+    for edge, path in paths.items():
+        shared = len(_get_shared(edge, path, mapped))
+        if shared > 0: demand[edge] = shared
+    load = {s_node:len(s_map) for s_node, s_map in mapped.items()}
+
+    # Greedy upper bound
+    num_sink = {}
+    greedy_load = dict(load)
+    for edge in sorted(demand, key=demand.get, reverse=True):
+        source, sink = edge
+        shared = demand[edge]
+        balance = (greedy_load[source] + shared - greedy_load[sink] + 1) // 2
+        num_sink[edge] = min(max(balance, 0), shared)
+        greedy_load[sink] += num_sink[edge]
+        greedy_load[source] += shared - num_sink[edge]
+    upper = max(greedy_load.values(), default=0)
+
+    # Lower bound from each node, and from both ends of each path
+    lower = max(load.values(), default=0)
+    for (source, sink), shared in demand.items():
+        lower = max(lower, -(-(load[source] + load[sink] + shared) // 2))
+
+    # Bisection on Z
+    while lower < upper:
+        Z = (lower + upper) // 2
+        split = _flow_split(demand, load, Z)
+        if split is None:
+            lower = Z + 1
+        else:
+            upper = Z
+            num_sink = split
+
+    if opts.verbose: print('Max chain: %s' % upper)
+
+    return num_sink
+
+def _assign_nodes(paths, num_sink, mapped):
     """ Once a solution to the linear program is found, the new mapping
     of nodes is transformed from the resulting number of target nodes to
     add to a source node, into the corresponding target nodes in the target
     graph.
     """
-    for edge, path in paths.items():
-        # Nodes in path excluding source and sink
-        shared = len(path) - 2
-        if shared>0:
+    # Nodes in path excluding source and sink, before any is assigned
+    shared = {edge:_get_shared(edge, path, mapped) for edge, path in paths.items()}
+    for edge, shared_nodes in shared.items():
+        if shared_nodes:
             source, sink = edge
 
-            var_t = var_map[edge][str(sink).replace(" ","")]
-
-            num_t = lp_sol[var_t]
+            num_t = num_sink[edge]
             # Path from traceback starts from sink
-            for i in range(1,shared+1):
+            for i, t_node in enumerate(shared_nodes, 1):
                 if i > num_t:
-                    mapped[source].add(path[i])
+                    mapped[source].add(t_node)
                 else:
-                    mapped[sink].add(path[i])
+                    mapped[sink].add(t_node)
 
 
 def _paths_to_chains(legal, paths, mapped, unassigned, opts):
-    """ Using a Linear Programming formulation, map the unassigned
-    target nodes, so that the maximum length chain in the embedding
-    is minimized.
+    """ Map the unassigned target nodes, so that the maximum length chain in
+    the embedding is minimized. By default, this is solved in-process as a
+    min-max splitting of paths (see _split_paths). Otherwise, using a Linear
+    Programming formulation.
 
     Linear Programming formulation to solve unassigned nodes.
 
@@ -429,18 +1281,16 @@ def _paths_to_chains(legal, paths, mapped, unassigned, opts):
         for node, shared in unassigned.items():
             print(str(node) + str(shared))
 
-    lp, var_map = _setup_lp(paths, mapped, unassigned)
+    _assign_forced(paths, mapped)
 
-    if opts.verbose==2: lp.writeLP("SHARING.lp")
+    if opts.split == 'flow':
+        num_sink = _split_paths(paths, mapped, opts)
+    elif opts.split == 'lp':
+        num_sink = _solve_lp(paths, mapped, unassigned, opts)
+    else:
+        raise ValueError("split %s not valid {'flow', 'lp'}." % opts.split)
 
-    lp.solve(solver=pulp.GLPK_CMD(msg=opts.verbose))
-
-    # read solution
-    lp_sol = {}
-    for v in  lp.variables():
-        lp_sol[v.name] = v.varValue
-
-    _assign_nodes(paths, lp_sol, var_map, mapped)
+    _assign_nodes(paths, num_sink, mapped)
 
     return mapped
 
@@ -449,7 +1299,15 @@ class RouterOptions(object):
         Optional parameters:
 
             random_seed (int, default=None):
-                Used as an argument for the RNG.
+                Used as an argument for the RNG. Runs with the same seed give
+                the same embedding, also in processes with different
+                PYTHONHASHSEED values.
+
+            order (str, default='random'): Order in which source nodes are
+                selected for routing, after the sinks of the last one.
+                'random': Shuffled with the RNG on every try.
+                'degree': Degree-descending.
+                'bfs': Breadth-first from the highest-degree node.
 
             tries (int, default=100):
                 The algorithm iteratively tries to find an embedding.
@@ -460,16 +1318,68 @@ class RouterOptions(object):
 
             rip_all (bool, default=False):
 
+            incremental (bool, default=False): After the first routing pass,
+                only rip up and reroute the paths crossing over-subscribed
+                target nodes, instead of source nodes in conflict. Ignores
+                rip_all. The number of conflicts per try is printed if verbose.
+
+            engine (str, default='networkx'): Storage of the target graph
+                routing state.
+                'networkx': Costs as attributes of the NetworkX node dicts.
+                'array': Target graph relabelled to contiguous integers, with
+                    CSR adjacency and costs in NumPy arrays. Produces the same
+                    embeddings as 'networkx' for the same random_seed.
+
+            steiner (str, default='sink'): Steiner tree search.
+                'sink': A new search from the source for every sink.
+                'multi': One multi-source search per source node, growing a
+                    single shortest-path tree that reaches all pending sinks.
+                'astar': A* search for every sink, using the tile distance as
+                    the lower bound of the path cost. Requires a
+                    dwave_networkx target graph (e.g. T=dnx.chimera_graph(16)).
+
+            radius (int, default=None): With steiner='astar', only expand the
+                target nodes in tiles within this distance of the range of
+                tiles of the source and sink. If the sink isn't reached, the
+                search is repeated without bounds. None is unbounded.
+
+            split (str, default='flow'): Assignment of the target nodes shared
+                by the source and sink of each path, minimizing the maximum
+                chain length.
+                'flow': In-process greedy split, with bisection and maximum-flow
+                    feasibility checks if it isn't proven optimal.
+                'lp': Linear program solved with GLPK (requires glpsol).
+
+            num_workers (int, default=1): Number of independently seeded
+                routers started in a process pool. Seeds are drawn from the RNG
+                and the best legal embedding by quality_key is returned.
+
+            first_legal (bool, default=False): If num_workers > 1, return the
+                legal embedding of the first run, in seed order, and terminate
+                the other workers once all runs before it have finished.
+
+            warm_start (dict, default=None): Prior embedding of the source
+                graph, e.g. from EmberaDataBase.load_embedding. Its chains,
+                without the target nodes missing from the target graph, seed
+                the incremental router, and only the source edges without a
+                coupler between their chains are routed. Chains are also used
+                as candidates of source nodes missing from initial_chains.
+
+            profile (bool, default=False): Return an Embedding with a
+                RouterStats profile of the run in properties['stats'].
+
             verbose (int): Verbosity level
                 0: Quiet mode
                 1: Print statements
-                2: Log LP problem
+                2: Log LP problem (split='lp')
     """
     def __init__(self, **params):
 
         self.random_seed = params.pop('random_seed', None)
         self.rng = Random(self.random_seed)
 
+        self.order = params.pop('order', 'random')
+
         self.tries =  params.pop('tries', 100)
 
         self.delta_p =  params.pop('delta_p', 0.45)
@@ -477,11 +1387,123 @@ class RouterOptions(object):
 
         self.rip_all = params.pop('rip_all', False)
 
+        self.incremental = params.pop('incremental', False)
+
+        self.engine = params.pop('engine', 'networkx')
+
+        self.steiner = params.pop('steiner', 'sink')
+        self.radius = params.pop('radius', None)
+
+        self.split = params.pop('split', 'flow')
+
+        self.num_workers = params.pop('num_workers', 1)
+        self.first_legal = params.pop('first_legal', False)
+
+        self.warm_start = params.pop('warm_start', None)
+
+        self.profile = params.pop('profile', False)
+
         self.verbose =  params.pop('verbose', 0)
 
         for name in params:
             raise ValueError("%s is not a valid parameter." % name)
 
+class RouterStats(object):
+    """ Routing profile of a router run. Returned as properties['stats'] of
+    the resulting Embedding if the profile option is set. Times in seconds.
+
+            tries (list of dict): Time spent in every try on node selection
+                ('select'), Steiner tree search ('steiner'), rip up ('rip'), and
+                update of the routing costs ('costs').
+
+            conflicts (list of int): Number of conflicts at the end of every
+                try. Source nodes in conflict, or congested target nodes if
+                incremental.
+
+            pushes, pops (int): Priority queue operations of all searches.
+
+            expanded (dict): Number of target nodes expanded to reach the sink
+                of a source edge, every time it was routed.
+                expanded = { Sg edge : [int] }
+
+            split (float): Time to map the shared target nodes of the paths
+                (see RouterOptions.split).
+    """
+    def __init__(self):
+        self.tries = []
+        self.conflicts = []
+        self.pushes = 0
+        self.pops = 0
+        self.expanded = {}
+        self.split = 0.0
+        # Expanded since the last sink was reached
+        self._expanded = 0
+
+    def new_try(self):
+        self.tries.append({'select':0.0, 'steiner':0.0, 'rip':0.0, 'costs':0.0})
+
+    def time(self, phase, start):
+        self.tries[-1][phase] += perf_counter() - start
+
+    def search(self, pushes, pops, expanded):
+        self.pushes += pushes
+        self.pops += pops
+        self._expanded += expanded
+
+    def reach(self, edge):
+        self.expanded.setdefault(edge, []).append(self._expanded)
+        self._expanded = 0
+
+    def totals(self):
+        """ Time spent on each phase over all tries """
+        totals = {'split':self.split}
+        for times in self.tries:
+            for phase, value in times.items():
+                totals[phase] = totals.get(phase, 0.0) + value
+        return totals
+
+def _find_embedding_worker(args):
+    """ Single router run of a multi-start. Returns the index of the run, and
+    its embedding or None if illegal.
+    """
+    index, Sg, Tg, initial_chains, params = args
+    try:
+        return index, find_embedding(Sg, Tg, initial_chains, **params)
+    except RuntimeError:
+        return index, None
+
+def _multi_start(Sg, Tg, initial_chains, params, opts):
+    """ Run independently seeded routers in a process pool, and return the
+    best legal embedding by quality_key. Ties are broken by the order of the
+    runs, so that the result doesn't depend on which worker finishes first.
+    """
+    params = dict(params, num_workers=1, first_legal=False)
+    runs = []
+    for index in range(opts.num_workers):
+        seed = opts.rng.randrange(2**32)
+        runs.append((index, Sg, Tg, initial_chains, dict(params, random_seed=seed)))
+
+    embeddings = {}
+    finished = set()
+    with multiprocessing.Pool(opts.num_workers) as pool:
+        for index, embedding in pool.imap_unordered(_find_embedding_worker, runs):
+            finished.add(index)
+            if embedding is not None:
+                embeddings[index] = embedding
+            # First legal run, once all runs before it have finished
+            if opts.first_legal and embeddings:
+                first = min(embeddings)
+                if finished.issuperset(range(first)): break
+    # Terminates remaining workers on exit
+
+    if not embeddings:
+        raise RuntimeError('Embedding is illegal.')
+
+    if opts.first_legal:
+        return embeddings[min(embeddings)]
+    index = min(embeddings, key=lambda i: (Embedding(embeddings[i]).quality_key, i))
+    return embeddings[index]
+
 def find_embedding(S, T, initial_chains, **params):
     """ find_embedding(S, T, **params)
     Heuristically attempt to find a minor-embedding of a graph, representing an
@@ -503,7 +1525,9 @@ def find_embedding(S, T, initial_chains, **params):
 
     Returns:
 
-        embedding: a dict that maps labels in S to lists of labels in T
+        embedding: a dict that maps labels in S to lists of labels in T. If
+            profile is set, an Embedding with the RouterStats of the run in
+            properties['stats'].
 
     """
 
@@ -513,10 +1537,26 @@ def find_embedding(S, T, initial_chains, **params):
 
     Tg = nx.Graph(T)
 
-    _init_graphs(Sg, Tg, initial_chains, opts)
+    if opts.num_workers > 1:
+        return _multi_start(Sg, Tg, initial_chains, params, opts)
+
+    target = _init_graphs(Sg, Tg, initial_chains, opts)
 
-    legal, paths, mapped, unassigned = _route(Sg, Tg, opts)
+    if opts.warm_start:
+        warm_start = _warm_start(Sg, Tg, target, opts)
+        legal, paths, mapped, unassigned = _route_incremental(Sg, target, opts, warm_start)
+    elif opts.incremental:
+        legal, paths, mapped, unassigned = _route_incremental(Sg, target, opts)
+    else:
+        legal, paths, mapped, unassigned = _route(Sg, target, opts)
 
+    paths, mapped, unassigned = target.labels(paths, mapped, unassigned)
+
+    start = perf_counter()
     embedding = _paths_to_chains(legal, paths, mapped, unassigned, opts)
 
+    if opts.profile:
+        target.stats.split = perf_counter() - start
+        return Embedding(embedding, stats=target.stats)
+
     return embedding
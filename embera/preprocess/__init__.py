@@ -1,6 +1,10 @@
 # Parsing
 from .tiling_parser import *
 # Global Placement
+from .placement_report import *
+from .graph_layout import *
 from .diffusion_placer import *
 from .simulated_annealing_placer import *
 from .complete_bipartite_placer import *
+# Batch placement
+from .batch import *
@@ -0,0 +1,92 @@
+""" Candidates for many source graphs on the same target graph.
+
+Every worker process receives the target graph once, so that the tiling and
+fault tables built by the placers, which are cached by target graph, are
+shared by all the source graphs placed by that worker.
+"""
+import multiprocessing
+
+from embera.preprocess import diffusion_placer
+from embera.preprocess import complete_bipartite_placer
+from embera.preprocess import simulated_annealing_placer
+
+__all__ = ['find_candidates_batch']
+
+# Candidate methods by name
+_METHODS = {'diffusion': diffusion_placer.find_candidates,
+            'annealing': simulated_annealing_placer.find_candidates,
+            'bipartite': complete_bipartite_placer.find_candidates}
+
+# Target graph, method, and parameters of the worker process
+_TARGET = None
+
+def _init_worker(Tg, method, params):
+    global _TARGET
+    _TARGET = (Tg, method, params)
+
+def _find_candidates(task, Tg, method, params):
+    """ Candidates of one source graph. Returns its index in the batch. """
+    index, S = task
+    return index, _METHODS[method](S, Tg, **dict(params))
+
+def _find_candidates_worker(task):
+    """ Candidates of one source graph, onto the target of the worker """
+    return _find_candidates(task, *_TARGET)
+
+def find_candidates_batch(sources, Tg, method='diffusion', **params):
+    """ find_candidates_batch(sources, Tg, method='diffusion', **params)
+    Find candidates for every source graph in sources, onto the same target
+    graph. Results are yielded as they are found, which may not be in the
+    order of sources if num_workers > 1.
+
+        Args:
+            sources: an iterable of source graphs, as taken by the
+                find_candidates function of the given method.
+
+            Tg: a NetworkX Graph with construction parameters such as those
+                generated using dwave_networkx_:
+                    family : {'chimera','pegasus', ...}
+                    rows : (int)
+                    columns : (int)
+                    labels : {'coordinate', 'int'}
+                    data : (bool)
+                    **family_parameters
+
+            method (str, default='diffusion'): Placer used for every source.
+                'diffusion': diffusion_placer.find_candidates
+                'annealing': simulated_annealing_placer.find_candidates
+                'bipartite': complete_bipartite_placer.find_candidates
+
+            **params (optional): Parameters of the placer, used for all
+                sources, and the following:
+
+                num_workers (int, default=1): Number of processes. If 1,
+                    sources are placed in this process.
+
+                chunksize (int, default=1): Number of sources sent to a
+                    worker at a time.
+
+        Returns:
+            results: an iterator of (index, candidates), where index is the
+                position of the source graph in sources.
+    """
+    if method not in _METHODS:
+        raise ValueError("method %s not valid {'diffusion', 'annealing',"
+                         " 'bipartite'}." % method)
+
+    num_workers = params.pop('num_workers', 1)
+    chunksize = params.pop('chunksize', 1)
+
+    return _iter_candidates(enumerate(sources), Tg, method, params,
+                            num_workers, chunksize)
+
+def _iter_candidates(tasks, Tg, method, params, num_workers, chunksize):
+    """ Generator of results, so that parameters are checked on call """
+    if num_workers > 1:
+        with multiprocessing.Pool(num_workers, _init_worker,
+                                  (Tg, method, params)) as pool:
+            yield from pool.imap_unordered(_find_candidates_worker, tasks,
+                                           chunksize)
+    else:
+        for task in tasks:
+            yield _find_candidates(task, Tg, method, params)
@@ -9,14 +9,25 @@ assign fewer unavailable qubits.
 NOTE: Because this systematic node mapping does not guarantee a valid
 embedding due to faulty qubits, these assignments are deemed candidates.
 
-NOTE 2: This method is only applicable to Chimera graphs.
+NOTE 2: This method is applicable to Chimera and Pegasus graphs. On Pegasus,
+rows and columns are those of one of the three Chimera subgraphs given by the
+nice coordinates (t, i, j, u, k).
 """
+import weakref
+import numpy as np
 import networkx as nx
+
+from time import perf_counter
 from embera.utilities.random import shuffle
-from dwave_networkx.generators.chimera import chimera_coordinates
+from embera.architectures.coordinates import chimera_coordinates, pegasus_coordinates
+from embera.preprocess.placement_report import PlacementReport
+from embera.preprocess.tiling_parser import graph_version
 
 __all__ = ['find_candidates', 'CompleteBipartitePlacer']
 
+# Fault tables by target graph. See CompleteBipartitePlacer._fault_table()
+_FAULT_TABLES = weakref.WeakKeyDictionary()
+
 class CompleteBipartitePlacer():
     """ This class can be used to create and transform systematic mappings of
         complete bipartite graphs onto Chimera target graphs.
@@ -46,28 +57,65 @@ class CompleteBipartitePlacer():
                     explored to find the orientation with fewer faults.
                     0: p=cols q=rows
                     1: p=rows q=cols
+                subgraph: (0, 1, 2, or None) (default None)
+                    Pegasus only. If not None, use the rows and columns of
+                    the Chimera subgraph with nice coordinate t=subgraph. If
+                    None, all subgraphs are explored.
     """
     def __init__(self, S, Tg, **params):
 
         # Parse parameters
         self.origin = params.pop('origin', None)
         self.orientation = params.pop('orientation', None)
+        self.subgraph = params.pop('subgraph', None)
 
         # Parse Target graph
         self.Tg = Tg
-        if Tg.graph['family'] != 'chimera':
-            raise ValueError("Invalid target graph family. Only valid for 'chimera' graphs")
+        family = Tg.graph['family']
+        labels = Tg.graph['labels']
+        if family == 'chimera':
+            self.m = Tg.graph['columns']
+            self.n = Tg.graph['rows']
+            self.t = Tg.graph['tile']
+            self.subgraphs = [0]
+            self.c2i = chimera_coordinates(self.n,self.m,self.t)
+            if labels == 'coordinate':
+                self.from_nice = self.c2i.nice_to_chimera
+                self.to_nice = self.c2i.chimera_to_nice
+                self.to_nice_array = self.c2i.chimera_to_nice_array
+            else:
+                self.from_nice = self.c2i.nice_to_linear
+                self.to_nice = self.c2i.linear_to_nice
+                self.to_nice_array = self.c2i.linear_to_nice_array
+        elif family == 'pegasus':
+            # Chimera subgraphs of nice coordinates have (M-1)x(M-1) K4,4 tiles
+            self.m = Tg.graph['columns'] - 1
+            self.n = Tg.graph['rows'] - 1
+            self.t = 4
+            self.subgraphs = [0, 1, 2]
+            self.c2i = pegasus_coordinates(Tg.graph['rows'])
+            if labels == 'nice':
+                self.from_nice = lambda n: n
+                self.to_nice = lambda n: n
+                self.to_nice_array = lambda nodes: np.array(nodes, dtype=int)
+            elif labels == 'coordinate':
+                self.from_nice = self.c2i.nice_to_pegasus
+                self.to_nice = self.c2i.pegasus_to_nice
+                self.to_nice_array = self.c2i.pegasus_to_nice_array
+            else:
+                self.from_nice = self.c2i.nice_to_linear
+                self.to_nice = self.c2i.linear_to_nice
+                self.to_nice_array = self.c2i.linear_to_nice_array
+        else:
+            raise ValueError("Invalid target graph family. Only valid for "
+                             "'chimera' and 'pegasus' graphs")
 
-        self.m = Tg.graph['columns']
-        self.n = Tg.graph['rows']
-        self.t = Tg.graph['tile']
-        self.coordinates = Tg.graph['labels'] == 'coordinate'
+        if self.subgraph is not None and self.subgraph not in self.subgraphs:
+            raise ValueError("Subgraph must be in %s." % self.subgraphs)
 
         self.qubit_cols = self.m * self.t
         self.qubit_rows = self.n * self.t
 
-        self.c2i = chimera_coordinates(self.m,self.n,self.t)
-
         # Parse Source graph.
         try:
             P, Q = nx.bipartite.sets(nx.Graph(S))
@@ -86,6 +134,67 @@ class CompleteBipartitePlacer():
         self.P = {k:[] for k in P}
         self.Q = {k:[] for k in Q}
         self.faults = None
+        # Report of the last run. See PlacementReport
+        self.report = PlacementReport()
+
+        # Summed-area table of coupler faults. See _fault_table()
+        self.fault_table = self._fault_table()
+
+    def _label(self, j, i, u, k):
+        """ Label of the qubit (j, i, u, k) of the selected Chimera subgraph """
+        return self.from_nice((self.subgraph or 0, j, i, u, k))
+
+    def _index(self, q):
+        """ Chimera index (j, i, u, k) of a qubit label """
+        _, j, i, u, k = self.to_nice(q)
+        return (j, i, u, k)
+
+    def _fault_table(self):
+        """ Summed-area tables of the missing intra-tile couplers of every
+        Chimera subgraph. Entry (row, col) of the fault grid is 1 if the
+        coupler between the qubit of column col and the qubit of row row is
+        missing, so that the number of faults in any window of rows and
+        columns is found in O(1) from the (qubit_rows+1, qubit_cols+1) table
+        of cumulative sums. Tables are built once per graph object, and
+        rebuilt if the nodes or edges of the graph have changed. See
+        tiling_parser.graph_version()
+        """
+        t = self.t
+        Tg = self.Tg
+
+        version = graph_version(Tg)
+        if Tg in _FAULT_TABLES:
+            table_version, table = _FAULT_TABLES[Tg]
+            if table_version is version:
+                return table
+
+        # Nice coordinates (t, j, i, u, k) of the nodes, by node position
+        nodes = list(Tg)
+        position = {q:x for x, q in enumerate(nodes)}
+        nice = np.asarray(self.to_nice_array(nodes), dtype=int).reshape(-1,5)
+        edges = np.array([(position[a], position[b]) for a, b in Tg.edges],
+                         dtype=int).reshape(-1,2)
+        g, j, i, u, k = (nice[edges, x] for x in range(5))
+
+        # Couplers between qubits of both shores of the same tile
+        intra = ((g[:,0]==g[:,1]) & (j[:,0]==j[:,1]) & (i[:,0]==i[:,1])
+                 & (u[:,0]!=u[:,1]))
+        # Pegasus qubits outside of the nice coordinates
+        intra &= ((j[:,0]>=0) & (j[:,0]<self.n) & (i[:,0]>=0) & (i[:,0]<self.m))
+        edge_index = np.flatnonzero(intra)
+        col_end = np.where(u[edge_index,0]==0, 0, 1)
+        col_k = k[edge_index, col_end]
+        row_k = k[edge_index, 1-col_end]
+        subgraphs = g[edge_index, 0]
+        rows = j[edge_index, 0]*t + row_k
+        cols = i[edge_index, 0]*t + col_k
+
+        faults = np.ones((len(self.subgraphs), self.qubit_rows, self.qubit_cols), dtype=int)
+        faults[subgraphs, rows, cols] = 0
+        table = np.zeros((len(self.subgraphs), self.qubit_rows+1, self.qubit_cols+1), dtype=int)
+        table[:,1:,1:] = faults.cumsum(axis=1).cumsum(axis=2)
+        _FAULT_TABLES[Tg] = (version, table)
+        return table
 
     def _slide_window(self):
         """ The sliding window method is a naive approach in which for a given size
@@ -121,65 +230,68 @@ class CompleteBipartitePlacer():
             origins_i = lambda width: range(qubit_cols-width+1)
             origins_j = lambda height: range(qubit_rows-height+1)
 
+        # Restrict search space if subgraph is given
+        subgraphs = self.subgraphs if self.subgraph is None else [self.subgraph]
+
+        start = perf_counter()
         best_origin = None
         best_count = p*q
-        # Sliding window through search space
-        for orientation, height, width in search_space:
-            for j in origins_j(height):
-                for i in origins_i(width):
-                    if (j+height) <= qubit_rows and (i+width) <= qubit_cols:
-                        count_faults = self._find_faults((j, i), width, height)
-                        if count_faults == 0:
-                            self.origin = (i, j) if orientation else (j, i)
-                            self.orientation = orientation
-                            (rows, cols), faults = self._assign_window_nodes()
-                            return (rows, cols), orientation, faults
-                        if count_faults < best_count:
-                            best_origin = (i, j) if orientation else (j, i)
-                            best_count = count_faults
-                            best_orientation = orientation
+        # Sliding window through search space. Fault counts of all origins
+        # (j, i) of a window are found at once from the summed-area table.
+        for subgraph, (orientation, height, width) in ((g, o) for g in subgraphs
+                                                       for o in search_space):
+            table = self.fault_table[subgraph]
+            if height > qubit_rows or width > qubit_cols: continue
+            j_range, i_range = origins_j(height), origins_i(width)
+            if not len(j_range) or not len(i_range): continue
+            j0, j1 = j_range[0], j_range[-1] + 1
+            i0, i1 = i_range[0], i_range[-1] + 1
+            if j1 + height - 1 > qubit_rows or i1 + width - 1 > qubit_cols: continue
+            counts = (table[j0+height:j1+height, i0+width:i1+width]
+                      - table[j0:j1, i0+width:i1+width]
+                      - table[j0+height:j1+height, i0:i1]
+                      + table[j0:j1, i0:i1])
+            self.report.iterations += counts.size
+            # First window in row-major order with the fewest faults
+            y, x = np.unravel_index(np.argmin(counts), counts.shape)
+            count_faults = int(counts[y, x])
+            window_origin = (int(j0 + y), int(i0 + x))
+            if count_faults == 0:
+                self.origin = window_origin
+                self.orientation = orientation
+                self.subgraph = subgraph
+                self.report.time('search', start)
+                start = perf_counter()
+                (rows, cols), faults = self._assign_window_nodes()
+                self.report.time('assign', start)
+                return (rows, cols), orientation, faults
+            if count_faults < best_count:
+                best_origin = window_origin
+                best_count = count_faults
+                best_orientation = orientation
+                best_subgraph = subgraph
 
         if best_origin is None:
             raise RuntimeError('Cannot fit problem in target graph.')
 
         self.origin = best_origin
         self.orientation = best_orientation
+        self.subgraph = best_subgraph
+        self.report.time('search', start)
 
+        start = perf_counter()
         (rows, cols), faults = self._assign_window_nodes()
+        self.report.time('assign', start)
         return (rows, cols), best_orientation, faults
 
-    def _find_faults(self, origin, width, height):
-        """ Traverse the target graph, starting at the given "origin" and count
-        the number of faults found.
+    def _find_faults(self, origin, width, height, subgraph=0):
+        """ Number of missing couplers between the columns and rows of qubits
+        of the window starting at the given "origin".
         """
-        t = self.t
-        Tg =  self.Tg
-
-        faults = 0
-        origin_row, origin_col = origin
-
-        for col in range(origin_col, origin_col+width):
-            i, k = divmod(col, t)
-            j_init = (origin_row) // t
-            final_row = (origin_row + height - 1)
-            j_end = final_row // t + 1
-            for j in range(j_init, j_end):
-                chimera_index = (j, i, 0, k)
-                if self.coordinates: chimera_label = chimera_index
-                else: chimera_label = self.c2i.int(chimera_index)
-
-                # Check couplers
-                for neighbour_k in range(t):
-                    neighbour_index = (j, i, 1, neighbour_k)
-                    row = j*t + neighbour_k
-                    # Skip unused coupler
-                    if row > final_row: continue
-                    # Check coupler
-                    if self.coordinates: neighbour_label = neighbour_index
-                    else: neighbour_label = self.c2i.int(neighbour_index)
-                    faults += (chimera_label, neighbour_label) not in Tg.edges
-
-        return faults
+        row, col = origin
+        table = self.fault_table[subgraph]
+        return int(table[row+height, col+width] - table[row, col+width]
+                   - table[row+height, col] + table[row, col])
 
     def _assign_window_nodes(self):
         """ Traverse the target graph, starting at the given "origin" and assign
@@ -216,9 +328,7 @@ class CompleteBipartitePlacer():
             j_end = final_row // t + 1
 
             for j in range(j_init, j_end):
-                chimera_index = (j, i, 0, k)
-                if self.coordinates: chimera_label = chimera_index
-                else: chimera_label = self.c2i.int(chimera_index)
+                chimera_label = self._label(j, i, 0, k)
 
                 # Check qubit
                 if chimera_label in Tg:
@@ -226,13 +336,11 @@ class CompleteBipartitePlacer():
 
                 # Check couplers
                 for neighbour_k in range(t):
-                    neighbour_index = (j, i, 1, neighbour_k)
                     row = j*t + neighbour_k
                     # Skip unused coupler
-                    if row > final_row: continue
+                    if row < origin_row or row > final_row: continue
                     # Check coupler
-                    if self.coordinates: neighbour_label = neighbour_index
-                    else: neighbour_label = self.c2i.int(neighbour_index)
+                    neighbour_label = self._label(j, i, 1, neighbour_k)
                     if (chimera_label, neighbour_label) not in Tg.edges:
                         # Use orientation to represent edge always as (p,q)
                         if orientation==0:
@@ -243,7 +351,7 @@ class CompleteBipartitePlacer():
                             chimera_edge = (neighbour_label, chimera_label)
                         faults[edge] = chimera_edge
 
-            if not cols[node]:
+            if not cols.get(node):
                 raise RuntimeError('Column %s is empty.' % col)
 
         rows = {}
@@ -252,16 +360,14 @@ class CompleteBipartitePlacer():
             i_init = (origin_col) // t
             i_end =  (origin_col+width-1) // t + 1
             for i in range(i_init, i_end):
-                chimera_index = (j, i, 1, k)
-                if self.coordinates: chimera_label = chimera_index
-                else: chimera_label = self.c2i.int(chimera_index)
+                chimera_label = self._label(j, i, 1, k)
 
                 # Check qubit
                 if chimera_label in Tg:
                     rows.setdefault(node, []).append(chimera_label)
                 # All coupler faults have been checked in the previous loop
 
-            if not rows[node]:
+            if not rows.get(node):
                 raise RuntimeError('Row %s is empty.' % row)
 
         return (rows, cols), faults
@@ -289,7 +395,7 @@ class CompleteBipartitePlacer():
 
         def sort_qubit(q):
             # u==0 use column i, u==1 use row j
-            (j,i,u,k) = q if self.coordinates else self.c2i.tuple(q)
+            (j,i,u,k) = self._index(q)
             return i*self.t+k if u==0 else j*self.t+k
 
         if sort_p:
@@ -402,9 +508,9 @@ class CompleteBipartitePlacer():
 
         # Parse P shore
         for v, chain in P.items():
-            if not K_pq.coordinates:
-                chain = K_pq.c2i.tuples(chain)
-            for (j,i,u,k) in chain:
+            for q in chain:
+                (g,j,i,u,k) = K_pq.to_nice(q)
+                K_pq.subgraph = g
                 if u==0:
                     col = i*K_pq.t + k
                     if col < origin_col:
@@ -420,9 +526,9 @@ class CompleteBipartitePlacer():
 
         # Parse Q shore
         for v, chain in Q.items():
-            if not K_pq.coordinates:
-                chain = K_pq.c2i.tuples(chain)
-            for (j,i,u,k) in chain:
+            for q in chain:
+                (g,j,i,u,k) = K_pq.to_nice(q)
+                K_pq.subgraph = g
                 if u==0:
                     col = i*K_pq.t + k
                     if col < origin_col:
@@ -460,6 +566,7 @@ class CompleteBipartitePlacer():
         """
 
         # Use sliding window greedy method to find best mapping
+        self.report = PlacementReport()
         (rows, cols), orientation, faults = self._slide_window()
 
         # Assign columns and rows to specified nodes
@@ -476,12 +583,13 @@ class CompleteBipartitePlacer():
             p,q = edge
             self.faults[(names_p[p], names_q[q])] = coupler
 
+        self.report.set_candidates({**self.P, **self.Q})
         return (self.P, self.Q), self.faults
 
 def find_candidates(S, Tg, **params):
     """ Given a complete complete bipartite source graph and a target chimera
-    graph of dimensions (m,n,t). Systematically find a mapping with a low
-    number of fault qubits in the qubit chains.
+    graph of dimensions (m,n,t), or pegasus graph. Systematically find a
+    mapping with a low number of fault qubits in the qubit chains.
 
         Args:
             S:  an iterable of label pairs representing the edges in the
@@ -508,11 +616,17 @@ def find_candidates(S, Tg, **params):
                     explored to find the orientation with fewer faults.
                     0: p=cols q=rows
                     1: p=rows q=cols
+                subgraph: (0, 1, 2, or None) (default None)
+                    Pegasus only. If not None, use the rows and columns of
+                    the Chimera subgraph with nice coordinate t=subgraph. If
+                    None, all subgraphs are explored.
                 shores: bool (default False)
                     See below. If True, return a tuple of dictionaries
                 show_faults: bool (default False)
                     See below. If True, return a dictionary of the source nodes
                     and their faulty qubits.
+                report: bool (default False)
+                    See below. If True, return the PlacementReport of the run.
 
         Returns:
             candidates: Dictionary of nodes mapping to qubits.
@@ -522,10 +636,13 @@ def find_candidates(S, Tg, **params):
             (optional) faults: Dictionary of faults in the graph.
                 If show_faults: A dictionary keyed by edges in the source graph,
                 with values for qubits without edges in the target graph.
+
+            (optional) report: PlacementReport of the window search.
     """
 
     shores = params.pop('shores', False)
     show_faults = params.pop('show_faults', False)
+    report = params.pop('report', False)
 
     placer = CompleteBipartitePlacer(S, Tg, **params)
     (P, Q), faults = placer.run()
@@ -534,7 +651,11 @@ def find_candidates(S, Tg, **params):
     else:
         candidates = {**P, **Q}
 
-    if show_faults:
+    if show_faults and report:
+        return candidates, faults, placer.report
+    elif show_faults:
         return candidates, faults
+    elif report:
+        return candidates, placer.report
     else:
         return candidates
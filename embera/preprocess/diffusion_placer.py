@@ -1,33 +1,55 @@
-import math
-import warnings
+import multiprocessing
+import numpy as np
 import networkx as nx
 import matplotlib.pyplot as plt
 
+from time import perf_counter
+from random import Random
+
+from embera.preprocess.graph_layout import find_layout
+from embera.preprocess.placement_report import PlacementReport
 from embera.preprocess.tiling_parser import DWaveNetworkXTiling
+from embera.preprocess.simulated_annealing_placer import SimulatedAnnealingPlacer
 from embera.architectures.drawing import draw_tiled_graph
 
 __all__ = ['find_candidates']
 
 class DiffusionPlacer(DWaveNetworkXTiling):
-    """ Diffusion-based migration of a graph layout
+    """ Diffusion-based migration of a graph layout. Node positions are kept
+        in an (N,2) array of (x,y) coordinates, and tile concentrations in an
+        (m,n) grid, so that every diffusion step is a few array operations.
     """
     def __init__(self, S, Tg, **params):
-        DWNetworkXTiling.__init__(self, Tg)
+        DWaveNetworkXTiling.__init__(self, Tg)
+
+        self.t_size = len(self.qubits)
 
-        self.p_size = len(S)
+        # Tile grid dimensions and supply of qubits per tile (i,j)
+        (self.m, self.n), supply, self.tile_qubits = self.table.grid()
+        self.supply = supply.copy()
 
+        # Placement tries. See run()
         self.tries = params.pop('tries', 1)
+        self.jitter = params.pop('jitter', 0.5)
+        self.score = params.pop('score', 'overflow')
+        self.num_workers = params.pop('num_workers', 1)
+        self.random_seed = params.pop('random_seed', None)
+        self.rng = Random(self.random_seed)
         self.verbose = params.pop('verbose', 0)
 
         # Choice of vicinity (Default: Directed). See _assign_candidates()
         self.vicinity = params.pop('vicinity', 3)
 
-        # Source graph layout
+        # Source graph layout. See find_layout()
+        Sg = S if type(S) is nx.Graph else nx.Graph(S)
         self.layout = params.pop('layout', None)
+        self.layout_method = params.pop('layout_method', None)
         if self.layout is None:
-            self.layout = nx.spring_layout(nx.Graph(S), weight=None)
-            warnings.warn("A spring layout of the unweighted graph"
-                            " was generated using NetworkX.")
+            self.layout = find_layout(Sg, self.layout_method)
+        else:
+            # Copy, as run() updates the layout in place
+            self.layout = dict(self.layout)
+        self.p_size = len(self.layout)
 
         # Diffusion hyperparameters
         self.enable_migration = params.pop('enable_migration', True)
@@ -42,8 +64,23 @@ class DiffusionPlacer(DWaveNetworkXTiling):
         for name in params:
             raise ValueError("%s is not a valid parameter." % name)
 
+        # Source nodes and their (x,y) positions
+        self.nodes = list(self.layout)
+        self.pos = np.array([self.layout[v] for v in self.nodes], dtype=float)
+        self.layout_pos = self.pos.copy()
+        # Source edges as pairs of node indices
+        index = {v:k for k, v in enumerate(self.nodes)}
+        self.edges = np.array([(index[u], index[v]) for u, v in Sg.edges
+                               if u != v], dtype=int).reshape(-1,2)
+        # Tile (i,j) of each source node, and concentration of each tile
+        self.tile_i = np.zeros(len(self.nodes), dtype=int)
+        self.tile_j = np.zeros(len(self.nodes), dtype=int)
+        self.concentration = np.zeros((self.m,self.n))
+
         # Mapping of source nodes to tile
         self.mapping = {}
+        # Report of the last run. See PlacementReport
+        self.report = PlacementReport()
 
     def _assign_candidates(self):
         """ Use tiling to create the sets of target
@@ -53,37 +90,35 @@ class DiffusionPlacer(DWaveNetworkXTiling):
                 2: Extended neighbors = (Immediate) + diagonals
                 3: Directed  = (Single) + 3 tiles closest to the node
         """
+        if self.vicinity not in range(4):
+            raise ValueError("vicinity %s not valid [0-3]." % self.vicinity)
 
         candidates = {}
-
-        for s_node, s_tile in self.mapping.items():
+        for s_node, (i,j) in self.mapping.items():
+            n, s, w, e = (i-1,j), (i+1,j), (i,j-1), (i,j+1)
+            nw, ne, se, sw = (i-1,j-1), (i-1,j+1), (i+1,j+1), (i+1,j-1)
             # Single tile
-            candidates[s_node] = self.tiles[s_tile].qubits
-            # Neighbouring tiles
-            n, s, w, e, nw, ne, se, sw = self.tiles[s_tile].neighbors
+            tiles = [(i,j)]
             if self.vicinity == 1:
                 # Immediate neighbors
-                for tile in [n,s,w,e]:
-                    candidates[s_node].update(self.tiles[tile].qubits)
+                tiles += [n, s, w, e]
             elif self.vicinity == 2:
                 # Extended neighbors
-                for tile in [n, s, w, e, nw, ne, se, sw]:
-                    candidates[s_node].update(self.tiles[tile].qubits)
+                tiles += [n, s, w, e, nw, ne, se, sw]
             elif self.vicinity == 3:
                 # Directed  = (Single) + 3 tiles closest to the node coordinates
                 x_coord, y_coord = self.layout[s_node]
-                i_index, j_index = s_tile
-                if x_coord >= j_index+0.5:
-                    if y_coord >= i_index+0.5: neighbor_tiles = (e,s,se)
-                    else: neighbor_tiles = (e,n,ne)
+                if x_coord >= j+0.5:
+                    if y_coord >= i+0.5: tiles += [e,s,se]
+                    else: tiles += [e,n,ne]
                 else:
-                    if y_coord >= i_index+0.5: neighbor_tiles = (w,s,sw)
-                    else: neighbor_tiles = (w,n,nw)
+                    if y_coord >= i+0.5: tiles += [w,s,sw]
+                    else: tiles += [w,n,nw]
 
-                for tile in neighbor_tiles:
-                    candidates[s_node].update(self.tiles[tile].qubits)
-            elif self.vicinity!=0:
-                raise ValueError("vicinity %s not valid [0-3]." % self.vicinity)
+            # Tiles outside of the tile array have no qubits
+            candidates[s_node] = set()
+            for tile in tiles:
+                candidates[s_node].update(self.tile_qubits.get(tile, ()))
 
         return candidates
 
@@ -98,22 +133,13 @@ class DiffusionPlacer(DWaveNetworkXTiling):
         t_width = n if not self.downscale else min(2 + (n*(P*exp_occ/T)), n)
         t_height = m if not self.downscale else min(2 + (m*(P*exp_occ/T)), m)
         # Find dimensions of source graph S
-        Sx_min = Sy_min = float("inf")
-        Sx_max = Sy_max = 0.0
-        # Loop through all source graph nodes to find dimensions
-        for sx, sy in self.layout.values():
-            Sx_min = min(sx, Sx_min)
-            Sx_max = max(sx, Sx_max)
-            Sy_min = min(sy, Sy_min)
-            Sy_max = max(sy, Sy_max)
-        s_width =  (Sx_max - Sx_min)
-        s_height = (Sy_max - Sy_min)
+        S_min = self.pos.min(axis=0)
+        s_width, s_height = self.pos.max(axis=0) - S_min
 
         # Define scaling factor
         scale_x = (t_width) / s_width
         scale_y = (t_height) / s_height
 
-
         if self.keep_ratio:
             keep_ratio = 0.0 if (self.keep_ratio is True) else self.keep_ratio
             if (scale_y > scale_x):
@@ -123,75 +149,57 @@ class DiffusionPlacer(DWaveNetworkXTiling):
                 scale_x = scale_y + (scale_x - scale_y ) * keep_ratio
                 t_width = s_width*scale_x
 
-        offset_x = ((n-t_width)/2.0) + 0.5
-        offset_y = ((m-t_height)/2.0) + 0.5
-        # Normalize, scale and accumulate initial distances
-        dist_accum = 0.0
-        t_center_x, t_center_y = n/2.0, m/2.0
-        for s_node, s_coords in self.layout.items():
-            (sx, sy) = s_coords
-            scaled_x = offset_x + ((sx-Sx_min) * scale_x)
-            scaled_y = offset_y + ((sy-Sy_min) * scale_y)
-            self.layout[s_node] = (scaled_x, scaled_y)
-            tile = self._coords_to_tile(scaled_x, scaled_y)
-            self.mapping[s_node] = tile
-            self.tiles[tile].nodes.add(s_node)
-            dist_accum += (scaled_x-t_center_x)**2 + (scaled_y-t_center_y)**2
+        offset = np.array([((n-t_width)/2.0) + 0.5, ((m-t_height)/2.0) + 0.5])
+        # Normalize and scale
+        self.pos = offset + (self.pos - S_min) * np.array([scale_x, scale_y])
 
         # Initial dispersion over 3 samples
-        dispersion = dist_accum/P
+        dispersion = self._dispersion()
         self.dispersion_accum = [dispersion] * 3
 
-        if self.verbose==4:
-            draw_tiled_graph(m, n, self.tiles, self.layout)
-            plt.show()
+    def _dispersion(self):
+        """ Average squared distance of the nodes to the centre of the tiles """
+        center = np.array([self.n/2.0, self.m/2.0])
+        return float(np.sum((self.pos - center)**2)) / self.p_size
 
-    def _coords_to_tile(self, x_coord, y_coord):
+    def _coords_to_tiles(self):
         """ Tile values are restricted.
-        Horizontallly 0<=i<=n
-        Vertically 0<=j<=m
-
-        """
-        j = max(min(math.floor(x_coord), self.n-1), 0)
-        i = max(min(math.floor(y_coord), self.m-1), 0)
-        tile = (i,j)
-        return tile
-
-
-    def _get_attractors(self, i, j):
-        """ Get three neighboring tiles that are in the direction
-            of the center of the tile array.
+        Horizontallly 0<=j<n
+        Vertically 0<=i<m
         """
-        n, s, w, e, nw, ne, se, sw = self.tiles[(i,j)].neighbors
-        lh = (j >= 0.5*self.n)
-        lv = (i >= 0.5*self.m)
-
-        if lh:
-            return (w, n, nw) if lv else (w, s, sw)
-        # else
-        return (e, n, ne) if lv else (e, s, se)
-
-    def _get_gradient(self, tile):
-        """ Get the x and y gradient from the concentration of Nodes
-            in neighboring tiles. The gradient is calculated against
-            tiles with concentration at limit value d_lim, in order to
-            force displacement of the nodes to the center of the tile array.
+        floor = np.floor(self.pos).astype(int)
+        self.tile_j = np.clip(floor[:,0], 0, self.n-1)
+        self.tile_i = np.clip(floor[:,1], 0, self.m-1)
+
+    def _get_gradient(self):
+        """ Get the x and y gradient of every tile from the concentration of
+            nodes in the three neighboring tiles in the direction of the center
+            of the tile array. The gradient is calculated against tiles with
+            concentration at limit value d_lim, in order to force displacement
+            of the nodes to the center of the tile array. Tiles outside of the
+            array have no concentration.
         """
+        m, n = self.m, self.n
         d_lim = self.d_lim
-        d_ij = tile.concentration
-
-        if d_ij == 0.0 or tile.name == None:
-            return 0.0, 0.0
-        h, v, hv = self._get_attractors(*tile.name)
-        d_h = self.tiles[h].concentration
-        d_v = self.tiles[v].concentration
-        d_hv = self.tiles[hv].concentration
-        gradient_x = - (d_lim - (d_h + 0.5*d_hv)) / (2.0 * d_ij)
-        gradient_y = - (d_lim - (d_v + 0.5*d_hv)) / (2.0 * d_ij)
+        d_ij = self.concentration
+        # Zero concentration around the tile array
+        padded = np.pad(d_ij, 1)
+        I, J = np.indices((m,n))
+        # Attractors: north if in the bottom half, else south. West if in the
+        # right half, else east.
+        di = np.where(I >= 0.5*m, -1, 1)
+        dj = np.where(J >= 0.5*n, -1, 1)
+        d_h = padded[I+1, J+1+dj]
+        d_v = padded[I+1+di, J+1]
+        d_hv = padded[I+1+di, J+1+dj]
+
+        occupied = d_ij != 0.0
+        denominator = np.where(occupied, 2.0*d_ij, 1.0)
+        gradient_x = np.where(occupied, - (d_lim - (d_h + 0.5*d_hv)) / denominator, 0.0)
+        gradient_y = np.where(occupied, - (d_lim - (d_v + 0.5*d_hv)) / denominator, 0.0)
 
         return gradient_x, gradient_y
 
-
     def _step(self):
         """ Discrete Diffusion Step
         """
@@ -205,31 +213,18 @@ class DiffusionPlacer(DWaveNetworkXTiling):
         viscosity = self.viscosity
         exp_occ = self.expected_occupancy
 
-        # Problem size
-        layout = self.layout
-
         # Diffusivity with expected average occupancy
         D = 1.0 - min((viscosity*P*exp_occ)/T, 1.0)
 
-        # Iterate over tiles
-        center_x, center_y = n/2.0, m/2.0
-        dist_accum = 0.0
-        for tile in self.tiles.values():
-            gradient_x, gradient_y = self._get_gradient(tile)
-            # Iterate over nodes in tile and migrate
-            for node in tile.nodes:
-                x, y = layout[node]
-                l_x = (2.0*x/n)-1.0
-                l_y = (2.0*y/m)-1.0
-                v_x = l_x * gradient_x
-                v_y = l_y * gradient_y
-                x_1 = x + D * v_x * delta_t
-                y_1 = y + D * v_y * delta_t
-                layout[node] = (x_1, y_1)
-                dist_accum += (x_1-center_x)**2 + (y_1-center_y)**2
-
-        dispersion = dist_accum/P
-        return dispersion
+        # Gradient of the tile of every node
+        gradient_x, gradient_y = self._get_gradient()
+        gradient = np.column_stack((gradient_x[self.tile_i,self.tile_j],
+                                    gradient_y[self.tile_i,self.tile_j]))
+        # Migrate
+        l = (2.0*self.pos/np.array([n,m])) - 1.0
+        self.pos = self.pos + D * l * gradient * delta_t
+
+        return self._dispersion()
 
     def _map_tiles(self):
         """ Use source nodes layout to determine tile mapping.
@@ -238,21 +233,32 @@ class DiffusionPlacer(DWaveNetworkXTiling):
             Using verbose==4, a call to draw_tiled_graph() plots
             source nodes over a tile grid.
         """
-
-        for s_node, s_coords in self.layout.items():
-            tile = self.mapping[s_node]
-            new_tile = self._coords_to_tile(*s_coords)
-            self.tiles[tile].nodes.remove(s_node)
-            self.tiles[new_tile].nodes.add(s_node)
-            self.mapping[s_node] = new_tile
-
-        for tile in self.tiles.values():
-            if tile.supply:
-                tile.concentration = len(tile.nodes)/tile.supply
+        m, n = self.m, self.n
+        self._coords_to_tiles()
+        population = np.bincount(self.tile_i*n + self.tile_j, minlength=m*n)
+        population = population.reshape(m,n)
+        supplied = self.supply > 0
+        self.concentration = np.divide(population, self.supply,
+                                       out=np.zeros((m,n)), where=supplied)
 
         if self.verbose==4:
-            draw_tiled_graph(self.m, self.n, self.tiles, self.layout)
-            plt.show()
+            self._draw()
+
+    def _update_layout(self):
+        """ Write back node positions and tiles """
+        for k, s_node in enumerate(self.nodes):
+            self.layout[s_node] = tuple(self.pos[k])
+            self.mapping[s_node] = (int(self.tile_i[k]), int(self.tile_j[k]))
+
+    def _draw(self):
+        """ Source nodes over the tile grid, with tile concentrations """
+        self._update_layout()
+        tiles = {}
+        for tile, tile_obj in self.tiles.items():
+            tile_obj.concentration = self.concentration[tile[-2:]]
+            tiles[tile[-2:]] = tile_obj
+        draw_tiled_graph(self.m, self.n, tiles, self.layout)
+        plt.show()
 
     def _condition(self, dispersion):
         """ The algorithm iterates until the dispersion, or average distance of
@@ -273,18 +279,101 @@ class DiffusionPlacer(DWaveNetworkXTiling):
         spread = variance > 0.01
         return spread and not increasing
 
-    def run(self):
-        """ Run two-stage global placement. Scale & Migrate.
+    def _score(self):
+        """ Cost of the current placement. Lower is better.
+                'overflow': Qubits expected to be used by the nodes in each
+                    tile, over the qubits in the tile, summed over all tiles.
+                'distance': Tile distance between adjacent source nodes,
+                    summed over all source edges.
+        """
+        if self.score == 'overflow':
+            population = self.concentration * self.supply
+            demand = population * self.expected_occupancy
+            return float(np.maximum(demand - self.supply, 0.0).sum())
+        elif self.score == 'distance':
+            u, v = self.edges[:,0], self.edges[:,1]
+            distance = (np.abs(self.tile_i[u] - self.tile_i[v]) +
+                        np.abs(self.tile_j[u] - self.tile_j[v]))
+            return float(distance.sum())
+        else:
+            raise ValueError("score %s not valid {'overflow', 'distance'}." % self.score)
+
+    def _place(self, seed=None):
+        """ Scale & Migrate. If a seed is given, positions are jittered by up
+            to jitter tiles after scaling. Returns the score of the placement.
+            Phase times and migration steps are added to self.report.
         """
+        report = self.report
+        start = perf_counter()
+        self.pos = self.layout_pos.copy()
         self._scale()
+        if seed is not None:
+            rng = np.random.default_rng(seed)
+            self.pos += rng.uniform(-self.jitter, self.jitter, self.pos.shape)
+        self._map_tiles()
+        report.time('scale', start)
+        start = perf_counter()
         migrating = self.enable_migration
         while migrating:
-            self._map_tiles()
             dispersion = self._step()
+            self._map_tiles()
             migrating = self._condition(dispersion)
+            report.iterations += 1
+        report.time('migrate', start)
+        return self._score()
+
+    def __getstate__(self):
+        # Coordinate converters of the tiling may be lambdas, and the
+        # couplers aren't needed by the workers.
+        state = dict(self.__dict__)
+        state.pop('to_nice', None)
+        state.pop('from_nice', None)
+        state.pop('to_nice_array', None)
+        state.pop('from_nice_array', None)
+        state.pop('_couplers', None)
+        return state
+
+    def run(self):
+        """ Run two-stage global placement. Scale & Migrate. Every try after
+            the first starts from a jittered layout, and the placement with
+            the lowest score is used to assign candidates.
+        """
+        self.report = PlacementReport()
+        seeds = [None] + [self.rng.randrange(2**32) for _ in range(self.tries-1)]
+        if self.num_workers > 1 and self.tries > 1:
+            with multiprocessing.Pool(self.num_workers) as pool:
+                placements = pool.map(_place_worker, [(self, seed) for seed in seeds])
+        else:
+            placements = [_place_worker((self, seed)) for seed in seeds]
+
+        scores = [placement[0] for placement in placements]
+        if self.verbose: print('Scores: %s' % scores)
+        best = scores.index(min(scores))
+        _, self.pos, self.tile_i, self.tile_j, self.concentration, _ = placements[best]
+        # Phase times and steps of all tries
+        for *_, report in placements:
+            self.report.iterations += report.iterations
+            for phase, time in report.times.items():
+                self.report.times[phase] = self.report.times.get(phase, 0.0) + time
+
+        start = perf_counter()
+        self._update_layout()
         candidates = self._assign_candidates()
+        self.report.time('assign', start)
+        self.report.dispersion = self._dispersion()
+        self.report.set_subscription(self.concentration * self.supply,
+                                     self.supply, self.expected_occupancy)
+        self.report.set_candidates(candidates)
         return candidates
 
+def _place_worker(args):
+    """ Single placement try. Returns the score and resulting placement. """
+    placer, seed = args
+    placer.report = PlacementReport()
+    score = placer._place(seed)
+    return (score, placer.pos, placer.tile_i, placer.tile_j,
+            placer.concentration, placer.report)
+
 
 def find_candidates(S, Tg, **params):
     """ find_candidates(S, Tg, **params)
@@ -293,9 +382,10 @@ def find_candidates(S, Tg, **params):
     nodes to target nodes, so that this mapping assists in a subsequent
     minor embedding.
 
-    If a layout is given, the chosen method to find candidates is
-    the DiffusionPlacer_ approach. If no layout is given, the
-    SimulatedAnnealingPlacer_ is used.
+    If a layout, a layout method, or positions in S.graph['pos'] are given,
+    the chosen method to find candidates is the DiffusionPlacer_ approach.
+    Otherwise, the SimulatedAnnealingPlacer_ is used, and only the parameters
+    of simulated_annealing_placer.find_candidates are valid.
 
         Args:
             S: an iterable of label pairs representing the edges in the
@@ -318,7 +408,25 @@ def find_candidates(S, Tg, **params):
 
         Optional parameters:
 
-            tries (int, default=1):
+            tries (int, default=1): Number of placements. Every try after the
+                first starts from the scaled layout jittered by up to jitter
+                tiles, and the placement with the lowest score is returned.
+
+            jitter (float, default=0.5): Maximum displacement, in tiles, of
+                every node at the start of a try.
+
+            score (str, default='overflow'): Placement quality metric.
+                'overflow': Sum over tiles of the qubits expected to be used
+                    (see expected_occupancy) in excess of the qubits in it.
+                'distance': Sum over source edges of the tile distance
+                    between the tiles of their nodes.
+
+            num_workers (int, default=1): Number of processes running tries.
+
+            random_seed (int, default=None): Seed of the jitter RNG.
+
+            report (bool, default=False): If True, return a tuple of the
+                candidates and the PlacementReport of the run.
 
             verbose (int, default=0): Verbosity level
                 0: Quiet mode
@@ -328,6 +436,16 @@ def find_candidates(S, Tg, **params):
             layout ({<node>:(<x>,<y>),...}, default=None):
                 Dict of 2D positions assigned to the source graph nodes.
 
+            layout_method (str or callable, default=None): If no layout is
+                given, method used to find one. See find_layout().
+                'graph': Positions in S.graph['pos'] (e.g. from
+                    graph_mmio.read_networkx)
+                'spring': NetworkX spring layout
+                'spectral': Sparse Laplacian eigenvectors
+                'multilevel': Coarsened force-directed layout
+                None: 'graph' if S has positions, otherwise the
+                    SimulatedAnnealingPlacer_ is used instead.
+
             vicinity (int, default=3): Granularity of the candidate assignment.
                 0: Single tile
                 1: Immediate neighbors = (north, south, east, west)
@@ -354,7 +472,19 @@ def find_candidates(S, Tg, **params):
 
     """
 
-    placer = DiffusionPlacer(S, Tg, **params)
+    report = params.pop('report', False)
+
+    Sg = nx.Graph(S)
+    if (params.get('layout') is None and params.get('layout_method') is None
+        and 'pos' not in Sg.graph):
+        params.pop('layout', None)
+        params.pop('layout_method', None)
+        placer = SimulatedAnnealingPlacer(Sg, Tg, **params)
+    else:
+        placer = DiffusionPlacer(Sg, Tg, **params)
     candidates = placer.run()
 
+    if report:
+        return candidates, placer.report
+
     return candidates
@@ -0,0 +1,203 @@
+""" Layout of source graphs used as the starting point of global placement.
+
+Layouts are cached per method and source graph, hashed from its sorted edge
+list as in EmberaDataBase.id_source, so that placing the same source graph
+again, e.g. on a different target, doesn't recompute it. The last
+LAYOUT_CACHE_SIZE layouts found in the process are kept.
+
+"""
+
+import json
+import warnings
+import numpy as np
+import networkx as nx
+import scipy.sparse as sp
+
+from hashlib import md5
+from collections import OrderedDict
+from scipy.sparse.linalg import eigsh
+from embera.interfaces.graph import Graph
+
+__all__ = ['find_layout']
+
+# Layouts by (method, seed, source graph hash), least recently used first
+_LAYOUTS = OrderedDict()
+LAYOUT_CACHE_SIZE = 64
+
+def _hash_graph(G):
+    """ Hash of the sorted edge list and nodes of a graph """
+    ser = Graph(G.edges).to_serializable()
+    ser['nodes'] = sorted(map(str, G))
+    return md5(json.dumps(ser, default=str).encode("utf-8")).hexdigest()
+
+def _adjacency(G, nodes):
+    """ Sparse adjacency matrix of an unweighted graph, in the order of nodes """
+    index = {v:i for i, v in enumerate(nodes)}
+    rows = [index[u] for u, v in G.edges if u != v]
+    cols = [index[v] for u, v in G.edges if u != v]
+    data = np.ones(2*len(rows))
+    return sp.csr_matrix((data, (rows+cols, cols+rows)), shape=(len(nodes),)*2)
+
+def _pack_components(G, component_layout, seed):
+    """ Layout every connected component separately, scaled by its number of
+    nodes, and place them next to each other from largest to smallest.
+    """
+    pos = {}
+    offset = 0.0
+    components = sorted(nx.connected_components(G), key=len, reverse=True)
+    for component in components:
+        H = G.subgraph(component)
+        if len(H) <= 3:
+            c_pos = nx.circular_layout(H)
+        else:
+            c_pos = component_layout(H, seed)
+        coords = np.array([c_pos[v] for v in H])
+        coords -= coords.min(axis=0)
+        extent = coords.max()
+        size = np.sqrt(len(H)/len(G))
+        if extent > 0.0: coords *= size/extent
+        for v, (x, y) in zip(H, coords):
+            pos[v] = (offset + x, y)
+        offset += size * 1.1
+    return pos
+
+def _spectral(G, seed):
+    """ Fiedler and third eigenvectors of the sparse graph Laplacian. The
+    smallest eigenvalues of L are the largest of c*I - L, for c above the
+    spectral radius of L, which Lanczos finds in few iterations.
+    """
+    nodes = list(G)
+    A = _adjacency(G, nodes)
+    degree = np.asarray(A.sum(axis=1)).ravel()
+    L = sp.diags(degree) - A
+    c = 2.0 * degree.max() + 1.0
+    M = sp.identity(len(nodes), format='csr') * c - L
+    v0 = np.random.default_rng(seed).random(len(nodes))
+    _, vectors = eigsh(M, k=3, which='LA', v0=v0)
+    # Eigenvalues in ascending order. Last one is the constant vector.
+    coords = vectors[:, [1, 0]]
+    return dict(zip(nodes, coords))
+
+def _coarsen(G):
+    """ Contract a maximal matching of the graph, visiting nodes from lowest
+    degree. Returns the coarse graph and the parent of every node.
+    """
+    parent = {}
+    for u in sorted(G, key=G.degree):
+        if u in parent: continue
+        parent[u] = u
+        for v in G[u]:
+            if v not in parent:
+                parent[v] = u
+                break
+    H = nx.Graph()
+    H.add_nodes_from(set(parent.values()))
+    H.add_edges_from((parent[u], parent[v]) for u, v in G.edges
+                     if parent[u] != parent[v])
+    return H, parent
+
+def _multilevel(G, seed, size=64, iterations=20):
+    """ Multilevel force-directed layout. The graph is coarsened by matching
+    until it has less than size nodes, which are laid out with a
+    spring layout. At every finer level, nodes start at the position of their
+    parent and are relaxed towards the centroid of their neighbours, as a
+    sparse matrix product per iteration.
+    """
+    rng = np.random.default_rng(seed)
+    levels = []
+    H = G
+    while len(H) > size:
+        H_coarse, parent = _coarsen(H)
+        if len(H_coarse) == len(H): break
+        levels.append((H, parent))
+        H = H_coarse
+
+    pos = nx.spring_layout(H, weight=None, seed=seed)
+    # Typical distance between nodes of the coarsest level
+    spacing = 1.0/np.sqrt(len(H))
+    for H, parent in reversed(levels):
+        nodes = list(H)
+        spacing /= np.sqrt(len(H)/len(set(parent.values())))
+        coords = np.array([pos[parent[v]] for v in nodes], dtype=float)
+        coords += rng.uniform(-spacing, spacing, coords.shape)
+        A = _adjacency(H, nodes)
+        degree = np.asarray(A.sum(axis=1)).ravel()
+        degree[degree == 0] = 1.0
+        for _ in range(iterations):
+            centroid = (A @ coords) / degree[:, None]
+            coords = 0.5*coords + 0.5*centroid
+        pos = dict(zip(nodes, coords))
+
+    return pos
+
+def _spring(G, seed):
+    return nx.spring_layout(G, weight=None, seed=seed)
+
+def find_layout(S, method=None, seed=None, cache=True):
+    """ find_layout(S, method=None, seed=None, cache=True)
+    Find a 2D layout of a source graph.
+
+        Args:
+            S: an iterable of label pairs representing the edges in the
+                source graph, or a NetworkX Graph.
+
+            method (str or callable, default=None):
+                'graph': Positions in S.graph['pos'], as those given by
+                    graph_mmio.read_networkx or benchmark.topologies.
+                'spring': NetworkX spring layout. O(N^2) per iteration.
+                'spectral': Eigenvectors of the sparse graph Laplacian.
+                'multilevel': Coarsened force-directed layout, O(E) per
+                    iteration.
+                callable: Function of a NetworkX Graph returning a dict of
+                    positions.
+                None: 'graph' if S has positions, otherwise 'spring'.
+
+            seed (int, default=None): Seed of the layout RNG.
+
+            cache (bool, default=True): Reuse the layout previously found for
+                the same method, seed, and source graph, if it is one of the
+                last LAYOUT_CACHE_SIZE layouts found.
+
+        Returns:
+            layout: a dict that maps labels in S to (x,y) positions.
+    """
+    G = S if type(S) is nx.Graph else nx.Graph(S)
+
+    if method is None:
+        if 'pos' in G.graph:
+            method = 'graph'
+        else:
+            method = 'spring'
+            warnings.warn("A spring layout of the unweighted graph"
+                            " was generated using NetworkX.")
+
+    if method == 'graph':
+        if 'pos' not in G.graph:
+            raise ValueError("method 'graph' requires positions in S.graph['pos'].")
+        return {v:tuple(G.graph['pos'][v]) for v in G}
+
+    if callable(method):
+        layout_method = lambda H, seed: method(H)
+    elif method == 'spring':
+        layout_method = _spring
+    elif method == 'spectral':
+        layout_method = lambda H, seed: _pack_components(H, _spectral, seed)
+    elif method == 'multilevel':
+        layout_method = lambda H, seed: _pack_components(H, _multilevel, seed)
+    else:
+        raise ValueError("method %s not valid {'graph', 'spring', 'spectral',"
+                         " 'multilevel'}." % method)
+
+    key = (method, seed, _hash_graph(G))
+    if cache and key in _LAYOUTS:
+        _LAYOUTS.move_to_end(key)
+        layout = _LAYOUTS[key]
+    else:
+        layout = {v:tuple(map(float, xy)) for v, xy in layout_method(G, seed).items()}
+        if cache:
+            _LAYOUTS[key] = layout
+            if len(_LAYOUTS) > LAYOUT_CACHE_SIZE:
+                _LAYOUTS.popitem(last=False)
+
+    # Copy, as placers update the layout in place
+    return dict(layout)
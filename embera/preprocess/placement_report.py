@@ -0,0 +1,67 @@
+""" Quality and timing report of a global placement. """
+import numpy as np
+
+from time import perf_counter
+
+__all__ = ['PlacementReport']
+
+class PlacementReport(object):
+    """ Report of a placer run. Returned by find_candidates if the report
+    option is set. Times in seconds.
+
+            iterations (int): Migration steps of DiffusionPlacer, temperatures
+                of SimulatedAnnealingPlacer, or windows evaluated by
+                CompleteBipartitePlacer, summed over all tries.
+
+            times (dict): Time spent in every phase, summed over all tries.
+                DiffusionPlacer: 'scale', 'migrate', 'assign'
+                SimulatedAnnealingPlacer: 'anneal', 'assign'
+                CompleteBipartitePlacer: 'search', 'assign'
+
+            dispersion (float): Average squared distance of the source nodes
+                to the centre of the tile array, at the end of the placement.
+                None for CompleteBipartitePlacer.
+
+            subscription (numpy.ndarray): (m,n) array of the qubits expected
+                to be used by the source nodes placed in every tile (i,j),
+                given expected_occupancy, minus the qubits in the tile.
+                Positive if oversubscribed, negative if undersubscribed. None
+                for CompleteBipartitePlacer.
+
+            candidate_sizes (dict): Number of candidates of every source node.
+    """
+    def __init__(self):
+        self.iterations = 0
+        self.times = {}
+        self.dispersion = None
+        self.subscription = None
+        self.candidate_sizes = {}
+
+    def time(self, phase, start):
+        self.times[phase] = self.times.get(phase, 0.0) + perf_counter() - start
+
+    def set_subscription(self, population, supply, expected_occupancy):
+        """ From the (m,n) arrays of source nodes and qubits per tile """
+        population = np.asarray(population, dtype=float)
+        self.subscription = population*expected_occupancy - np.asarray(supply)
+
+    def set_candidates(self, candidates):
+        self.candidate_sizes = {v:len(c) for v, c in candidates.items()}
+
+    @property
+    def oversubscribed(self):
+        """ Number of tiles with more qubits expected to be used than qubits """
+        if self.subscription is None: return None
+        return int(np.count_nonzero(self.subscription > 0))
+
+    @property
+    def min_candidates(self):
+        """ Smallest candidate set. Empty sets are certain to fail routing. """
+        return min(self.candidate_sizes.values(), default=0)
+
+    def __repr__(self):
+        times = ', '.join('%s=%.4f' % item for item in self.times.items())
+        return ('PlacementReport(iterations=%s, times={%s}, dispersion=%s, '
+                'oversubscribed=%s, min_candidates=%s)'
+                % (self.iterations, times, self.dispersion,
+                   self.oversubscribed, self.min_candidates))
@@ -1,67 +1,281 @@
-import warnings
+import math
+import numpy as np
+import networkx as nx
+
+from time import perf_counter
+from random import Random
 
 from embera.preprocess.tiling_parser import DWaveNetworkXTiling
+from embera.preprocess.placement_report import PlacementReport
 
 __all__ = ['find_candidates', 'SimulatedAnnealingPlacer']
 
 class SimulatedAnnealingPlacer(DWaveNetworkXTiling):
-    """ A simulated annealing based global placement
+    """ A simulated annealing based global placement. Source nodes are moved
+        between the (i,j) tiles of the target graph to minimize the tile
+        distance between adjacent nodes (wirelength), plus the qubits expected
+        to be used in each tile in excess of the qubits in it (overflow).
+        Moves only change the cost of the edges of the node and of the two
+        tiles involved, so every move is evaluated in O(degree).
     """
-    def __init__(self, S, T, **params):
+    def __init__(self, S, Tg, **params):
         DWaveNetworkXTiling.__init__(self, Tg)
 
+        # Tile grid dimensions and supply of qubits per tile (i,j)
+        (self.m, self.n), supply, self.tile_qubits = self.table.grid()
+        self.supply = supply.astype(int).tolist()
+
         self.tries = params.pop('tries', 1)
+        self.random_seed = params.pop('random_seed', None)
+        self.rng = Random(self.random_seed)
         self.verbose = params.pop('verbose', 0)
 
-        # Choice of vicinity. See below.
-        self.vicinity = params.pop('vicinity', 0)
+        # Choice of vicinity (Default: Directed). See _assign_candidates()
+        self.vicinity = params.pop('vicinity', 3)
+
+        # Cost function
+        self.expected_occupancy = params.pop('expected_occupancy', 2.50)
+        self.overflow_weight = params.pop('overflow_weight', 2.0)
+
+        # Temperature schedule. See _anneal()
+        self.t_initial = params.pop('t_initial', None)
+        self.cooling = params.pop('cooling', 'adaptive')
+        self.inner_num = params.pop('inner_num', 1.0)
+        self.t_exit = params.pop('t_exit', 0.005)
 
         # Check if all parameters have been parsed.
         for name in params:
             raise ValueError("%s is not a valid parameter." % name)
 
+        if self.cooling != 'adaptive' and not (isinstance(self.cooling, float)
+                                             and 0.0 < self.cooling < 1.0):
+            raise ValueError("cooling %s not valid {'adaptive', (0.0,1.0)}." % self.cooling)
+
+        # Source nodes and adjacency lists of node indices
+        Sg = nx.Graph(S)
+        self.nodes = list(Sg)
+        index = {v:k for k, v in enumerate(self.nodes)}
+        self.adj = [[index[u] for u in Sg[v] if u != v] for v in self.nodes]
+        self.num_edges = sum(map(len, self.adj)) // 2
+
+        # Tile (i,j) of each source node, and number of nodes in each tile
+        self.tile_i = [0] * len(self.nodes)
+        self.tile_j = [0] * len(self.nodes)
+        self.count = [[0]*self.n for _ in range(self.m)]
+
         # Mapping of source nodes to tile
         self.mapping = {}
+        # Report of the last run. See PlacementReport
+        self.report = PlacementReport()
 
     def _assign_candidates(self):
-        """ Use tiling to create the sets of target nodes assigned
-        to each source node.
+        """ Use tiling to create the sets of target
+            nodes assigned to each source node.
+                0: Single tile
+                1: Immediate neighbors = (north, south, east, west)
+                2: Extended neighbors = (Immediate) + diagonals
+                3: Directed  = (Single) + 3 tiles closest to the centroid
+                    of the tiles of the adjacent nodes
         """
+        if self.vicinity not in range(4):
+            raise ValueError("vicinity %s not valid [0-3]." % self.vicinity)
 
         candidates = {}
-
-        for s_node, s_tile in self.mapping.items():
-            if self.vicinity == 0:
-                # Single tile
-                candidates[s_node] = self.tiles[s_tile].qubits
-            else:
-                # Neighbouring tiles (N, S, W, E, NW, NE, SE, SW)
-                neighbors = self.tiles[s_tile].neighbors
-                if self.vicinity == 1:
-                    # Immediate neighbors
-                    candidates[s_node] = self.tiles[s_tile].qubits
-                    for tile in neighbors[0:3]:
-                        candidates[s_node].update(self.tiles[tile].qubits)
-                elif self.vicinity == 2:
-                    # Extended neighbors
-                    candidates[s_node] = self.tiles[s_tile].qubits
-                    for tile in neighbors:
-                        candidates[s_node].update(self.tiles[tile].qubits)
+        for k, s_node in enumerate(self.nodes):
+            i, j = self.tile_i[k], self.tile_j[k]
+            n, s, w, e = (i-1,j), (i+1,j), (i,j-1), (i,j+1)
+            nw, ne, se, sw = (i-1,j-1), (i-1,j+1), (i+1,j+1), (i+1,j-1)
+            # Single tile
+            tiles = [(i,j)]
+            if self.vicinity == 1:
+                # Immediate neighbors
+                tiles += [n, s, w, e]
+            elif self.vicinity == 2:
+                # Extended neighbors
+                tiles += [n, s, w, e, nw, ne, se, sw]
+            elif self.vicinity == 3 and self.adj[k]:
+                # Directed  = (Single) + 3 tiles closest to the centroid
+                y_coord = sum(self.tile_i[u] for u in self.adj[k])/len(self.adj[k])
+                x_coord = sum(self.tile_j[u] for u in self.adj[k])/len(self.adj[k])
+                if x_coord >= j:
+                    if y_coord >= i: tiles += [e,s,se]
+                    else: tiles += [e,n,ne]
                 else:
-                    raise ValueError("vicinity %s not valid [0-3]." % self.vicinity)
+                    if y_coord >= i: tiles += [w,s,sw]
+                    else: tiles += [w,n,nw]
+
+            # Tiles outside of the tile array have no qubits
+            candidates[s_node] = set()
+            for tile in tiles:
+                candidates[s_node].update(self.tile_qubits.get(tile, ()))
 
         return candidates
 
-    def run():
-        #TODO: Simulated Annealing placement
-        warnings.warn('Work in progress.')
-        init_loc = {}
-        # for s_node in S:
-            # i = randint(0, self.n)
-            # j = randint(0, self.m)
-            # self.mapping[node] = (i, j)
+    def _dispersion(self):
+        """ Average squared distance of the nodes, at the centre of their
+            tiles, to the centre of the tile array. As in DiffusionPlacer.
+        """
+        if not self.nodes: return 0.0
+        y = np.array(self.tile_i) + 0.5 - self.m/2.0
+        x = np.array(self.tile_j) + 0.5 - self.n/2.0
+        return float(np.sum(x**2 + y**2)) / len(self.nodes)
+
+    def _overflow(self, count, supply):
+        """ Qubits expected to be used in a tile in excess of its supply """
+        return max(count*self.expected_occupancy - supply, 0.0)
+
+    def _cost(self):
+        """ Wirelength and overflow of the current placement """
+        tile_i, tile_j = self.tile_i, self.tile_j
+        wirelength = sum(abs(tile_i[u]-tile_i[v]) + abs(tile_j[u]-tile_j[v])
+                         for u, adj in enumerate(self.adj) for v in adj if u < v)
+        overflow = sum(self._overflow(self.count[i][j], self.supply[i][j])
+                       for i in range(self.m) for j in range(self.n))
+        return wirelength, overflow
+
+    def _delta(self, k, i, j):
+        """ Change of the wirelength and overflow from moving node k to tile
+            (i,j). Only the edges of k and the source and destination tiles are
+            visited.
+        """
+        tile_i, tile_j = self.tile_i, self.tile_j
+        i0, j0 = tile_i[k], tile_j[k]
+        if i == i0 and j == j0: return 0, 0.0
+        d_wire = 0
+        for u in self.adj[k]:
+            iu, ju = tile_i[u], tile_j[u]
+            d_wire += abs(i-iu) + abs(j-ju) - abs(i0-iu) - abs(j0-ju)
+        # Overflow of the source and destination tiles, before and after
+        a = self.expected_occupancy
+        c0, s0 = self.count[i0][j0]*a, self.supply[i0][j0]
+        c1, s1 = self.count[i][j]*a, self.supply[i][j]
+        d_over = (max(c0-a-s0, 0.0) - max(c0-s0, 0.0)
+                  + max(c1+a-s1, 0.0) - max(c1-s1, 0.0))
+        return d_wire, d_over
+
+    def _move(self, k, i, j):
+        self.count[self.tile_i[k]][self.tile_j[k]] -= 1
+        self.count[i][j] += 1
+        self.tile_i[k], self.tile_j[k] = i, j
+
+    def _random_move(self, rng, rlim):
+        """ Random node and destination tile within rlim tiles of the node """
+        k = rng.randrange(len(self.nodes))
+        i0, j0 = self.tile_i[k], self.tile_j[k]
+        r = int(rlim)
+        i = rng.randint(max(i0-r, 0), min(i0+r, self.m-1))
+        j = rng.randint(max(j0-r, 0), min(j0+r, self.n-1))
+        return k, i, j
+
+    def _initial_placement(self, rng):
+        """ Uniformly random tile, out of the tiles with qubits """
+        tiles = [(i,j) for i in range(self.m) for j in range(self.n)
+                 if self.supply[i][j]]
+        self.count = [[0]*self.n for _ in range(self.m)]
+        for k in range(len(self.nodes)):
+            i, j = rng.choice(tiles)
+            self.tile_i[k], self.tile_j[k] = i, j
+            self.count[i][j] += 1
 
+    def _anneal(self, rng):
+        """ Anneal from a random placement. The initial temperature, if not
+            given, is 20 times the standard deviation of the cost change of N
+            random moves. Every temperature performs inner_num * N^(4/3)
+            moves to tiles within a range limit. If cooling is 'adaptive', the
+            temperature and the range limit are updated from the acceptance
+            rate, as in VPR; otherwise, the temperature is multiplied by
+            cooling. Annealing stops when the temperature is below t_exit
+            times the cost per source edge. Returns the final cost.
+        """
+        N = len(self.nodes)
+        self._initial_placement(rng)
+        wirelength, overflow = self._cost()
+        weight = self.overflow_weight
+        cost = wirelength + weight*overflow
+        if N < 2: return cost
+
+        rlim = float(max(self.m, self.n))
+        if self.t_initial is None:
+            deltas = []
+            for _ in range(N):
+                k, i, j = self._random_move(rng, rlim)
+                d_wire, d_over = self._delta(k, i, j)
+                deltas.append(d_wire + weight*d_over)
+            mean = sum(deltas)/N
+            std = math.sqrt(sum((d-mean)**2 for d in deltas)/N)
+            temperature = 20.0 * std
+        else:
+            temperature = self.t_initial
+
+        moves = max(int(self.inner_num * N**(4.0/3.0)), 1)
+        num_temps = 0
+        while temperature > self.t_exit * cost / max(self.num_edges, 1):
+            accepted = 0
+            random_move, get_delta, move = self._random_move, self._delta, self._move
+            for _ in range(moves):
+                k, i, j = random_move(rng, rlim)
+                d_wire, d_over = get_delta(k, i, j)
+                delta = d_wire + weight*d_over
+                if delta <= 0 or rng.random() < math.exp(-delta/temperature):
+                    move(k, i, j)
+                    wirelength += d_wire
+                    overflow += d_over
+                    cost += delta
+                    accepted += 1
+            num_temps += 1
+            self.report.iterations += 1
+            rate = accepted/moves
+            if self.cooling == 'adaptive':
+                if rate > 0.96: alpha = 0.5
+                elif rate > 0.8: alpha = 0.9
+                elif rate > 0.15: alpha = 0.95
+                else: alpha = 0.8
+                rlim = min(max(rlim * (0.56 + rate), 1.0), max(self.m, self.n))
+            else:
+                alpha = self.cooling
+            temperature *= alpha
+            if self.verbose:
+                print('T=%.4f cost=%.1f (wirelength=%d overflow=%.1f) rate=%.3f rlim=%.1f'
+                      % (temperature, cost, wirelength, overflow, rate, rlim))
+            if temperature == 0.0: break
+
+        # Final greedy pass
+        for _ in range(moves):
+            k, i, j = self._random_move(rng, 1.0)
+            d_wire, d_over = self._delta(k, i, j)
+            delta = d_wire + weight*d_over
+            if delta < 0:
+                self._move(k, i, j)
+                cost += delta
+
+        if self.verbose: print('Temperatures: %s Cost: %s' % (num_temps, cost))
+        return cost
+
+    def run(self):
+        """ Run simulated annealing tries, each with a seed drawn from
+            random_seed, and assign candidates from the lowest cost placement.
+        """
+        self.report = PlacementReport()
+        best = None
+        for _ in range(self.tries):
+            rng = Random(self.rng.randrange(2**32))
+            start = perf_counter()
+            cost = self._anneal(rng)
+            self.report.time('anneal', start)
+            if best is None or cost < best[0]:
+                best = (cost, list(self.tile_i), list(self.tile_j),
+                        [list(row) for row in self.count])
+        _, self.tile_i, self.tile_j, self.count = best
+
+        start = perf_counter()
+        self.mapping = {s_node:(self.tile_i[k], self.tile_j[k])
+                        for k, s_node in enumerate(self.nodes)}
         candidates = self._assign_candidates()
+        self.report.time('assign', start)
+        self.report.dispersion = self._dispersion()
+        self.report.set_subscription(self.count, self.supply,
+                                     self.expected_occupancy)
+        self.report.set_candidates(candidates)
         return candidates
 
 def find_candidates(S, Tg, **params):
@@ -91,16 +305,54 @@ def find_candidates(S, Tg, **params):
             candidates: a dict that maps labels in S to lists of labels in T
 
         Optional parameters:
-            topology ({<node>:(<x>,<y>),...}):
-                Dict of 2D positions assigned to the source graph nodes.
 
-            vicinity (int): Granularity of the candidate assignment.
+            tries (int, default=1): Number of annealing runs. The placement
+                with the lowest cost is returned.
+
+            random_seed (int, default=None): Seed of the annealing RNG.
+
+            report (bool, default=False): If True, return a tuple of the
+                candidates and the PlacementReport of the run.
+
+            verbose (int, default=0): Verbosity level
+                0: Quiet mode
+                1: Print statements
+
+            vicinity (int, default=3): Granularity of the candidate assignment.
                 0: Single tile
                 1: Immediate neighbors = (north, south, east, west)
                 2: Extended neighbors = (Immediate) + diagonals
+                3: Directed  = (Single) + 3 tiles closest to the centroid of
+                    the tiles of the adjacent nodes
+
+            expected_occupancy (float, default=2.5): Number of qubits expected
+                to be used per problem node on average.
+
+            overflow_weight (float, default=2.0): Weight of the overflow of
+                qubits in the tiles against the wirelength, in tiles, of the
+                source edges.
+
+            t_initial (float, default=None): Initial temperature. If None, 20
+                times the standard deviation of the cost of random moves.
+
+            cooling ('adaptive' or float, default='adaptive'): Temperature
+                schedule. If 'adaptive', the cooling rate and range of moves
+                depend on the acceptance rate. If a float in (0,1), the
+                temperature is multiplied by it after every iteration.
+
+            inner_num (float, default=1.0): Moves per temperature, times
+                the number of source nodes to the power of 4/3.
+
+            t_exit (float, default=0.005): Annealing stops when the
+                temperature is below t_exit times the cost per source edge.
     """
 
+    report = params.pop('report', False)
+
     placer = SimulatedAnnealingPlacer(S, Tg, **params)
     candidates = placer.run()
 
+    if report:
+        return candidates, placer.report
+
     return candidates
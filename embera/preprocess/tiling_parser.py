@@ -1,6 +1,101 @@
+import weakref
 import embera
+import numpy as np
 
-__all__ = ['DWaveNetworkXTiling']
+__all__ = ['DWaveNetworkXTiling', 'TileTable', 'get_tiling']
+
+# Tile tables by target graph. See TileTable.from_graph()
+_TABLES = weakref.WeakKeyDictionary()
+
+# Adjacency snapshots by target graph. See graph_version()
+_VERSIONS = weakref.WeakKeyDictionary()
+
+# Tilings by target graph. See get_tiling()
+_TILINGS = weakref.WeakKeyDictionary()
+
+# (di,dj) of the tile neighbors: N, S, W, E, NW, NE, SE, SW
+DIRECTIONS = [(-1,0), (1,0), (0,-1), (0,1), (-1,-1), (-1,1), (1,1), (1,-1)]
+
+class TileTable:
+    """ Precomputed arrays of a tiling. Tiles and qubits are indexed in the
+        order of self.tiles and self.qubits.
+            qubit_tile: Tile index of every qubit.
+            order, offsets: Qubit indices sorted by tile, so that the qubits
+                of tile k are order[offsets[k]:offsets[k+1]].
+            supply: Number of qubits of every tile.
+            neighbors: (num_tiles, 8) tile indices of the neighbors of every
+                tile in the (i,j) dimensions, in DIRECTIONS order, or -1 if
+                there is no such tile.
+            adjacent: Tile indices of the tiles one step away in any of the
+                tile dimensions. See DWaveNetworkXTiling.get_tile_neighbors()
+            tile_qubits, tile_neighbors: Labels of the qubits and of the
+                neighbor tiles of every tile.
+    """
+    def __init__(self, qubits, tiles_of_qubits):
+        self.qubits = list(qubits)
+        self.qubit_index = {q:k for k, q in enumerate(self.qubits)}
+        self.tiles = sorted(set(tiles_of_qubits))
+        self.tile_index = {tile:k for k, tile in enumerate(self.tiles)}
+
+        self.qubit_tile = np.array([self.tile_index[tile] for tile in tiles_of_qubits],
+                                   dtype=int).reshape(-1)
+        self.order = np.argsort(self.qubit_tile, kind='stable')
+        self.supply = np.bincount(self.qubit_tile, minlength=len(self.tiles))
+        self.offsets = np.concatenate(([0], np.cumsum(self.supply)))
+
+        self.neighbors = np.full((len(self.tiles), len(DIRECTIONS)), -1, dtype=int)
+        self.adjacent = []
+        for k, tile in enumerate(self.tiles):
+            *t, i, j = tile
+            for d, (di, dj) in enumerate(DIRECTIONS):
+                neighbor = tuple(t) + (i+di, j+dj)
+                self.neighbors[k,d] = self.tile_index.get(neighbor, -1)
+            adjacent = set()
+            for x, d in enumerate(tile):
+                adjacent.add(tile[0:x] + (d-1,) + tile[x+1:])
+                adjacent.add(tile[0:x] + (d+1,) + tile[x+1:])
+            self.adjacent.append([self.tile_index[a] for a in adjacent
+                                  if a in self.tile_index])
+
+        # Labels of the qubits and neighbors of every tile
+        self.tile_qubits = [[self.qubits[q] for q in self.order[start:end]]
+                            for start, end in zip(self.offsets[:-1], self.offsets[1:])]
+        self.tile_neighbors = [[self.tiles[x] if x >= 0 else None for x in row]
+                               for row in self.neighbors.tolist()]
+
+    def grid(self):
+        """ Tiles merged by their last two (i,j) dimensions, as used by the
+            placers. Returns the (m,n) grid shape, an (m,n) array of the
+            number of qubits, and a dict of the qubits of every (i,j). Computed
+            once per table.
+        """
+        if getattr(self, '_grid', None) is None:
+            ij = np.array([tile[-2:] for tile in self.tiles], dtype=int).reshape(-1,2)
+            m, n = ij.max(axis=0) + 1
+            supply = np.zeros((m,n))
+            np.add.at(supply, (ij[:,0], ij[:,1]), self.supply)
+            tile_qubits = {}
+            for (i,j), qubits in zip(ij.tolist(), self.tile_qubits):
+                tile_qubits.setdefault((i,j), []).extend(qubits)
+            self._grid = (int(m), int(n)), supply, tile_qubits
+        return self._grid
+
+    @classmethod
+    def from_graph(cls, Tg, get_tiles):
+        """ Table of the graph Tg, built once per graph object. The table is
+            rebuilt if the set of nodes or the number of edges of the graph
+            has changed. The function get_tiles(qubits) returns the tiles of
+            a list of qubits.
+        """
+        key = (frozenset(Tg.nodes), Tg.number_of_edges())
+        if Tg in _TABLES:
+            table_key, table = _TABLES[Tg]
+            if table_key == key:
+                return table
+        qubits = list(Tg.nodes)
+        table = cls(qubits, get_tiles(qubits))
+        _TABLES[Tg] = (key, table)
+        return table
 
 class DWaveNetworkXTiling:
     """ Generate tiling from architecture graph construction. According to
@@ -10,7 +105,7 @@ class DWaveNetworkXTiling:
         # Graph elements
         self.graph = Tg.graph
         self.qubits = list(Tg.nodes)
-        self.couplers = list(Tg.edges)
+        self._couplers = tuple(Tg.edges)
         # Graph dimensions
         m = self.graph["rows"]
         n = self.graph["columns"]
@@ -26,23 +121,38 @@ class DWaveNetworkXTiling:
         dim = len(self.shape)
         labels = self.graph['labels']
         converter = embera.dwave_coordinates.from_graph_dict(self.graph)
-        if labels is 'int':
+        if labels == 'int':
             self.to_nice = converter.linear_to_nice
             self.from_nice = converter.nice_to_linear
-        elif labels is 'coordinate':
+            self.to_nice_array = converter.linear_to_nice_array
+            self.from_nice_array = converter.nice_to_linear_array
+        elif labels == 'coordinate':
             self.to_nice = converter.coordinate_to_nice
             self.from_nice = converter.nice_to_coordinate
-        elif labels is 'nice':
+            self.to_nice_array = converter.coordinate_to_nice_array
+            self.from_nice_array = converter.nice_to_coordinate_array
+        elif labels == 'nice':
             self.to_nice = lambda n: n
             self.from_nice = lambda n: n
-        # Add Tile objects
-        self.tiles = {}
-        for q in self.qubits:
-            tile = self.get_tile(q)
-            if tile in self.tiles:
-                self.tiles[tile].qubits.append(q)
-            else:
-                self.tiles[tile] = Tile(tile, self.shape, [q])
+            self.to_nice_array = lambda nodes: np.array(nodes, dtype=int).reshape(-1,5)
+            self.from_nice_array = lambda nice: nice
+        # Precomputed tile arrays, shared by all tilings of the same graph
+        self.table = TileTable.from_graph(Tg, self.get_tiles)
+        # Tile objects are added on first use. See tiles
+        self._tiles = None
+
+    @property
+    def tiles(self):
+        if self._tiles is None:
+            self._tiles = {}
+            for k, tile in enumerate(self.table.tiles):
+                self._tiles[tile] = Tile(tile, self.shape, list(self.table.tile_qubits[k]))
+                self._tiles[tile].neighbors = list(self.table.tile_neighbors[k])
+        return self._tiles
+
+    @property
+    def couplers(self):
+        return list(self._couplers)
 
     def __iter__(self):
         return self.tiles
@@ -57,9 +167,17 @@ class DWaveNetworkXTiling:
         return self.tiles.items()
 
     def get_tile(self, x):
+        table = getattr(self, 'table', None)
+        if table is not None and x in table.qubit_index:
+            return table.tiles[table.qubit_tile[table.qubit_index[x]]]
         t,i,j,u,k = self.to_nice(x)
         return (t,i,j)[-len(self.shape):]
 
+    def get_tiles(self, qubits):
+        """ Tiles of a list of qubits, converted in bulk """
+        nice = self.to_nice_array(qubits)[:,:3]
+        return list(map(tuple, nice[:,-len(self.shape):].tolist()))
+
     def set_tile(self, x, tile):
         _,_,_,u,k = self.to_nice(x)
         return self.from_nice((0,)*(3-len(tile)) + tile + (u,k))
@@ -90,19 +208,34 @@ class DWaveNetworkXTiling:
                 yield self.from_nice(n)
 
     def get_tile_neighbors(self, tile):
-        neighbors = set()
-        for i, d in enumerate(tile):
-            neg = tile[0:i] + (d-1,) + tile[i+1:]
-            neighbors.add(neg)
-            pos = tile[0:i] + (d+1,) + tile[i+1:]
-            neighbors.add(pos)
-        return [tile for tile in neighbors if tile in self.tiles]
+        table = self.table
+        if tile in table.tile_index:
+            adjacent = [table.tiles[k] for k in table.adjacent[table.tile_index[tile]]]
+        else:
+            adjacent = set()
+            for i, d in enumerate(tile):
+                adjacent.add(tile[0:i] + (d-1,) + tile[i+1:])
+                adjacent.add(tile[0:i] + (d+1,) + tile[i+1:])
+        return [tile for tile in adjacent if tile in self.tiles]
 
 class Tile:
-    """ Tile Class """
+    """ Tile Class. Neighbors are the tiles in the N, S, W, E, NW, NE, SE,
+        SW directions, or None if outside of the tiling. Concentration is set
+        by placers.
+    """
     def __init__(self, index, shape, qubits):
         self.index = index
         self.qubits = qubits
+        self.neighbors = [None] * len(DIRECTIONS)
+        self.concentration = 0.0
+
+    @property
+    def name(self):
+        return self.index
+
+    @property
+    def nodes(self):
+        return self.qubits
 
     @property
     def supply(self):
@@ -122,3 +255,52 @@ class Tile:
 
     def __str__(self):
         return str(self.index)
+
+def graph_version(Tg):
+    """ graph_version(Tg)
+    Version of the nodes and edges of a graph. The same object is returned
+    until they change, so that tables cached by graph object are stale if
+    they weren't built with the current version. Changes are found comparing
+    the adjacency of the graph with a snapshot, without hashing every edge.
+
+        Args:
+            Tg: a NetworkX Graph
+
+        Returns:
+            version: a snapshot of the adjacency of Tg, which must not be
+                modified.
+    """
+    # Dict of dicts of the graph, as its adjacency views compare in Python
+    adj = Tg._adj
+    version = _VERSIONS.get(Tg)
+    if (version is not None and len(version) == len(adj) and
+        all(nbrs.keys() == version.get(u) for u, nbrs in adj.items())):
+        return version
+    version = {u:frozenset(nbrs) for u, nbrs in adj.items()}
+    _VERSIONS[Tg] = version
+    return version
+
+def get_tiling(Tg):
+    """ get_tiling(Tg)
+    Tiling of a target graph, built once per graph object, and rebuilt if the
+    nodes or edges of the graph have changed. See graph_version()
+
+        Args:
+            Tg: a NetworkX Graph with construction parameters such as those
+                generated using dwave_networkx_:
+                    family : {'chimera','pegasus', ...}
+                    rows : (int)
+                    columns : (int)
+                    labels : {'coordinate', 'int'}
+
+        Returns:
+            tiling: a DWaveNetworkXTiling. It must not be modified.
+    """
+    version = graph_version(Tg)
+    if Tg in _TILINGS:
+        tiling_version, tiling = _TILINGS[Tg]
+        if tiling_version is version:
+            return tiling
+    tiling = DWaveNetworkXTiling(Tg)
+    _TILINGS[Tg] = (version, tiling)
+    return tiling
@@ -1,12 +1,20 @@
+import weakref
 import minorminer
+import multiprocessing
 
 import numpy as np
+import networkx as nx
+import dwave_networkx as dnx
+
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
 
 from embera.utilities.decorators import nx_graph
-from embera.preprocess.tiling_parser import DWaveNetworkXTiling
+from embera.preprocess.tiling_parser import get_tiling, graph_version
 
 __all__ = ['translate','mirror','rotate','spread_out','open_seam',
-           'iter_sliding_window', 'greedy_fit','reconnect']
+           'compose_transforms','iter_sliding_window','lp_chain_reduce',
+           'greedy_fit','reconnect']
 
 """ ################### Naive Embedding Transformations ####################
     Transformation methods for embeddings onto Tiled D-Wave Architectures
@@ -52,32 +60,7 @@ def translate(T, embedding, origin=(0,0)):
             >>> new_embedding = embera.transform.embedding.translate(T,embedding,origin)
             >>> dnx.draw_chimera_embedding(T,new_embedding,node_size=10)
     """
-    tiling = DWaveNetworkXTiling(T)
-    shape = tiling.shape
-    # Initialize offset
-    offset = shape
-    # Find margins
-    for v,chain in embedding.items():
-        for q in chain:
-            tile = np.array(tiling.get_tile(q))
-            offset = [min(t,o) for t,o in zip(tile,offset)]
-    # Define flips
-    m,n = tiling.shape
-    t = tiling.graph['tile']
-    new_embedding = {}
-    for v,chain in embedding.items():
-        new_chain = []
-        for q in chain:
-            k = tiling.get_k(q)
-            tile = tiling.get_tile(q)
-            shore = tiling.get_shore(q)
-            new_tile = tuple(np.array(tile) - np.array(offset) + np.array(origin))
-            new_q = tiling.set_tile(q,new_tile)
-            new_chain.append(new_q)
-        new_embedding[v] = new_chain
-
-    return new_embedding
-
+    return compose_transforms(T, embedding, [('translate', origin)])
 
 def mirror(T, embedding, axis=0):
     """ Flip the embedding on the same graph to re-distribute qubit
@@ -100,32 +83,7 @@ def mirror(T, embedding, axis=0):
             >>> new_embedding = embera.transform.embedding.mirror(T,embedding,axis)
             >>> dnx.draw_chimera_embedding(T,new_embedding,node_size=10)
     """
-    tiling = DWaveNetworkXTiling(T)
-    shape = np.array(tiling.shape)
-    # Define flips
-    m,n = tiling.shape
-    t = tiling.graph['tile']
-    if axis is 0:
-        new_tile = lambda i,j: (i,n-j-1)
-        new_k = lambda k,shore: k if shore else t-k-1
-    elif axis is 1:
-        new_tile = lambda i,j: (m-i-1,j)
-        new_k = lambda k,shore: t-k-1 if shore else k
-    else:
-        raise ValueError("Value of axis not supported")
-    # Mirror all qubits by chain
-    new_embedding = {}
-    for v,chain in embedding.items():
-        new_chain = []
-        for q in chain:
-            k = tiling.get_k(q)
-            tile = tiling.get_tile(q)
-            shore = tiling.get_shore(q)
-            new_coordinates = (new_tile(*tile),shore,new_k(k,shore))
-            new_chain.append(next(tiling.get_qubits(*new_coordinates)))
-        new_embedding[v] = new_chain
-
-    return new_embedding
+    return compose_transforms(T, embedding, [('mirror', axis)])
 
 def rotate(T, embedding, theta=90):
     """ Rotate the embedding on the same graph to re-distribute qubit
@@ -149,40 +107,9 @@ def rotate(T, embedding, theta=90):
             >>> new_embedding = embera.transform.embedding.rotate(T,embedding,theta)
             >>> dnx.draw_chimera_embedding(T,new_embedding,node_size=10)
     """
-    tiling = DWaveNetworkXTiling(T)
-    shape = np.array(tiling.shape)
-    # Define rotations
-    m,n = tiling.shape
-    t = tiling.graph['tile']
-    if theta in [90,-270]:
-        new_tile = lambda i,j: (j, m-i-1)
-        new_shore = lambda shore: 0 if shore else 1
-        new_k = lambda k,shore: t-k-1 if shore else k
-    elif theta in [180,-180]:
-        new_tile = lambda i,j: (m-i-1,n-j-1)
-        new_shore = lambda shore: shore
-        new_k = lambda k,shore: t-k-1
-    elif theta in [-90,270]:
-        new_tile = lambda i,j: (n-j-1, i)
-        new_shore = lambda shore: 0 if shore else 1
-        new_k = lambda k,shore: k if shore else t-k-1
-    elif theta in [0,360]:
+    if theta in [0,360]:
         return embedding
-    else:
-        raise ValueError("Value of theta not supported")
-    # Rotate all qubits by chain
-    new_embedding = {}
-    for v,chain in embedding.items():
-        new_chain = []
-        for q in chain:
-            k = tiling.get_k(q)
-            tile = tiling.get_tile(q)
-            shore = tiling.get_shore(q)
-            new_coordinates = (new_tile(*tile),new_shore(shore),new_k(k,shore))
-            new_chain.append(next(tiling.get_qubits(*new_coordinates)))
-        new_embedding[v] = new_chain
-
-    return new_embedding
+    return compose_transforms(T, embedding, [('rotate', theta)])
 
 def spread_out(T, embedding, sheer=None):
     """ Transform the tile assignment to spread out the embedding starting from
@@ -205,39 +132,7 @@ def spread_out(T, embedding, sheer=None):
             >>> new_embedding = embera.transform.embedding.spread_out(T,embedding)
             >>> dnx.draw_chimera_embedding(T,new_embedding,node_size=10)
     """
-    tiling = DWaveNetworkXTiling(T)
-    shape = np.array(tiling.shape)
-    # Initialize edges
-    origin = shape
-    end = (0,)*len(origin)
-    # Find edges
-    for v,chain in embedding.items():
-        for q in chain:
-            tile = np.array(tiling.get_tile(q))
-            origin = [min(t,o) for t,o in zip(tile,origin)]
-            end = [max(t,e) for t,e in zip(tile,end)]
-    # Make sure it fits
-    if tuple((np.array(end)-np.array(origin))*2) > tiling.shape:
-        raise RuntimeError("Can't spread out")
-    # Spread out all qubits by chain
-    new_embedding = {}
-    if sheer is None:
-        shift = lambda tile,origin: (tile-origin)*2
-    elif sheer == 0:
-        shift = lambda tile,origin: (tile-origin)*2+np.flip((tile-origin)%[2,1])
-    elif sheer == 1:
-        shift = lambda tile,origin: (tile-origin)*2+np.flip((tile-origin)%[1,2])
-
-    for v,chain in embedding.items():
-        new_chain = []
-        for q in chain:
-            tile = np.array(tiling.get_tile(q))
-            new_tile = tuple(shift(tile,origin))
-            new_q = tiling.set_tile(q,new_tile)
-            new_chain.append(new_q)
-        new_embedding[v] = new_chain
-
-    return new_embedding
+    return compose_transforms(T, embedding, [('spread_out', sheer)])
 
 def open_seam(T, embedding, seam, direction):
     """
@@ -264,34 +159,7 @@ def open_seam(T, embedding, seam, direction):
             >>> new_embedding = embera.transform.embedding.open_seam(T,embedding,seam,direction)
             >>> dnx.draw_chimera_embedding(T,new_embedding,node_size=10)
     """
-    tiling = DWaveNetworkXTiling(T)
-
-    if direction is 'left':
-        shift = lambda tile: tile[1]<=seam
-        offset = np.array([0,-1])
-    elif direction is 'right':
-        shift = lambda tile: tile[1]>=seam
-        offset = np.array([0,+1])
-    elif direction is 'up':
-        shift = lambda tile: tile[0]<=seam
-        offset = np.array([-1,0])
-    elif direction is 'down':
-        shift = lambda tile: tile[0]>=seam
-        offset = np.array([+1,0])
-    else:
-        raise ValueError("Direction not in {'left','right','up','down'}")
-
-    new_embedding = {}
-    for v,chain in embedding.items():
-        new_chain = []
-        for q in chain:
-            tile = np.array(tiling.get_tile(q))
-            new_tile = tuple(tile + offset) if shift(tile) else tuple(tile)
-            new_q = tiling.set_tile(q,new_tile)
-            new_chain.append(new_q)
-        new_embedding[v] = new_chain
-
-    return new_embedding
+    return compose_transforms(T, embedding, [('open_seam', seam, direction)])
 
 def iter_sliding_window(T, embedding):
     """ Use a sliding window approach to iteratively transport the embedding
@@ -311,37 +179,376 @@ def iter_sliding_window(T, embedding):
             ...     dnx.draw_chimera_embedding(T,new_embedding,node_size=10)
             ...     plt.pause(0.2)
     """
-    tiling = DWaveNetworkXTiling(T)
+    tiling = get_tiling(T)
+    variables, chain_ids, nice = _flatten(tiling, embedding)
+    for slide in _iter_windows(tiling, nice):
+        yield _rebuild(tiling, variables, chain_ids, slide)
+
+
+""" ####################### Vectorized Transformations #####################
+    Embeddings are flattened once into an (N,5) array of the nice coordinates
+    (t,i,j,u,k) of all qubits, and an array with the index of the chain of
+    every qubit. Transformations are integer array operations on the nice
+    coordinates, and chains are rebuilt at the end. The functions above are
+    single transformations. Use compose_transforms() to apply a sequence of
+    them in one pass.
+"""
+def _flatten(tiling, embedding):
+    """ Variables, chain index of every qubit, and (N,5) nice coordinates """
+    variables = list(embedding)
+    chains = [list(embedding[v]) for v in variables]
+    chain_ids = np.repeat(np.arange(len(chains)), [len(chain) for chain in chains])
+    nice = tiling.to_nice_array([q for chain in chains for q in chain])
+    return variables, chain_ids, np.array(nice, dtype=int).reshape(-1,5)
+
+def _rebuild(tiling, variables, chain_ids, nice):
+    """ Embedding from the flattened chains. See _flatten() """
+    labels = np.asarray(tiling.from_nice_array(nice))
+    labels = labels.tolist() if labels.ndim == 1 else list(map(tuple, labels.tolist()))
+    offsets = np.searchsorted(chain_ids, np.arange(len(variables)+1)).tolist()
+    return {v:labels[a:b] for v, a, b in zip(variables, offsets[:-1], offsets[1:])}
+
+def _translate(tiling, nice, origin=(0,0)):
+    dim = len(tiling.shape)
+    tiles = nice[:,3-dim:3]
+    # Left-uppermost occupied tile
+    offset = np.vstack((tiling.shape, tiles)).min(axis=0)
+    nice[:,3-dim:3] = tiles - offset + np.array(origin)
+    return nice
+
+def _mirror(tiling, nice, axis=0):
+    m,n = tiling.shape
+    t = tiling.graph['tile']
+    _, i, j, u, k = nice.T
+    if axis == 0:
+        j[:] = n-j-1
+        k[:] = np.where(u, k, t-k-1)
+    elif axis == 1:
+        i[:] = m-i-1
+        k[:] = np.where(u, t-k-1, k)
+    else:
+        raise ValueError("Value of axis not supported")
+    nice[:,0] = 0
+    return nice
+
+def _rotate(tiling, nice, theta=90):
+    m,n = tiling.shape
+    t = tiling.graph['tile']
+    _, i, j, u, k = nice.T.copy()
+    if theta in [90,-270]:
+        new = (j, m-i-1, 1-u, np.where(u, t-k-1, k))
+    elif theta in [180,-180]:
+        new = (m-i-1, n-j-1, u, t-k-1)
+    elif theta in [-90,270]:
+        new = (n-j-1, i, 1-u, np.where(u, k, t-k-1))
+    elif theta in [0,360]:
+        return nice
+    else:
+        raise ValueError("Value of theta not supported")
+    nice[:,0] = 0
+    nice[:,1:] = np.column_stack(new)
+    return nice
+
+def _spread_out(tiling, nice, sheer=None):
+    dim = len(tiling.shape)
+    tiles = nice[:,3-dim:3]
+    origin = np.vstack((tiling.shape, tiles)).min(axis=0)
+    end = np.vstack(((0,)*dim, tiles)).max(axis=0)
+    # Make sure it fits
+    if tuple((end-origin)*2) > tiling.shape:
+        raise RuntimeError("Can't spread out")
+    delta = tiles - origin
+    if sheer is None:
+        new_tiles = delta*2
+    elif sheer == 0:
+        new_tiles = delta*2 + (delta%[2,1])[:,::-1]
+    elif sheer == 1:
+        new_tiles = delta*2 + (delta%[1,2])[:,::-1]
+    else:
+        raise ValueError("Value of sheer not supported")
+    nice[:,3-dim:3] = new_tiles
+    return nice
+
+def _open_seam(tiling, nice, seam, direction):
+    dim = len(tiling.shape)
+    tiles = nice[:,3-dim:3]
+    if direction == 'left':
+        shift = tiles[:,1]<=seam
+        offset = np.array([0,-1])
+    elif direction == 'right':
+        shift = tiles[:,1]>=seam
+        offset = np.array([0,+1])
+    elif direction == 'up':
+        shift = tiles[:,0]<=seam
+        offset = np.array([-1,0])
+    elif direction == 'down':
+        shift = tiles[:,0]>=seam
+        offset = np.array([+1,0])
+    else:
+        raise ValueError("Direction not in {'left','right','up','down'}")
+    nice[:,3-dim:3] = tiles + np.outer(shift, offset)
+    return nice
+
+def _iter_windows(tiling, nice):
+    """ Nice coordinates of the embedding moved to every window. See
+        iter_sliding_window()
+    """
     shape = np.array(tiling.shape)
-    # Initialize edges
-    origin = shape
-    end = (0,)*len(origin)
+    dim = len(shape)
     # Find edges
-    for v,chain in embedding.items():
-        for q in chain:
-            tile = np.array(tiling.get_tile(q))
-            origin = [min(t,o) for t,o in zip(tile,origin)]
-            end = [max(t,e) for t,e in zip(tile,end)]
+    tiles = nice[:,3-dim:3]
+    origin = np.vstack((shape, tiles)).min(axis=0)
+    end = np.vstack(((0,)*dim, tiles)).max(axis=0)
 
     # Move tiles to origin and translate to try and find valid embedding
-    size = np.array(end) - np.array(origin)
-    interactions = lambda u,v,E:((s,t) for s in E[u] for t in E[v])
-    is_connected = lambda edges: any(T.has_edge(s,t) for s,t in edges)
+    size = end - origin
     for x in range(shape[1]-size[1]):
         for y in range(shape[0]-size[0]):
-            slide = {}
             offset = np.array([x,y])
             # Translate all qubits
-            for v,chain in embedding.items():
-                new_chain = []
-                for q in chain:
-                    tile = np.array(tiling.get_tile(q))
-                    new_tile = tuple(tile - np.array(origin) + offset)
-                    new_q = tiling.set_tile(q,new_tile)
-                    new_chain.append(new_q)
-                slide[v] = new_chain
+            slide = nice.copy()
+            slide[:,3-dim:3] = tiles - origin + offset
             yield slide
 
+# Array transformations by name. See compose_transforms()
+_TRANSFORMS = {'translate': _translate,
+               'mirror': _mirror,
+               'rotate': _rotate,
+               'spread_out': _spread_out,
+               'open_seam': _open_seam}
+
+def compose_transforms(T, embedding, transforms):
+    """ Apply a sequence of transformations to the embedding. Qubits are
+        converted to nice coordinates once, transformed, and converted back
+        once, so that composing many transformations costs about the same as
+        applying one.
+
+        Arguments (continued):
+            transforms: (list of tuples)
+                Transformations applied in order. Every tuple holds the name
+                of the transformation in {'translate', 'mirror', 'rotate',
+                'spread_out', 'open_seam'}, followed by its arguments.
+
+        Example:
+            >>> import embera
+            >>> import networkx as nx
+            >>> import dwave_networkx as dnx
+            >>> S = nx.complete_graph(11)
+            >>> T = dnx.chimera_graph(7)
+            >>> embedding = minorminer.find_embedding(S,T)
+            >>> transforms = [('rotate',90), ('mirror',1), ('translate',(2,3))]
+            >>> new_embedding = embera.transform.embedding.compose_transforms(T,embedding,transforms)
+            >>> dnx.draw_chimera_embedding(T,new_embedding,node_size=10)
+    """
+    for name, *args in transforms:
+        if name not in _TRANSFORMS:
+            raise ValueError("Transformation %s not valid {'translate', "
+                             "'mirror', 'rotate', 'spread_out', 'open_seam'}."
+                             % name)
+    tiling = get_tiling(T)
+    variables, chain_ids, nice = _flatten(tiling, embedding)
+    for name, *args in transforms:
+        nice = _TRANSFORMS[name](tiling, nice, *args)
+    return _rebuild(tiling, variables, chain_ids, nice)
+
+""" ########################### Validity Checking ##########################
+    Transformed copies of an embedding are checked with arrays precomputed
+    once per embedding and target graph. Qubits are indexed by their nice
+    coordinates in the full-yield graph, and the couplers of T are a bitset of
+    index pairs. Translations, mirrors and rotations preserve the adjacency of
+    the full-yield graph, so the only qubit pairs that may be coupled in any
+    transformed copy are those adjacent in the original embedding.
+"""
+# Target arrays by target graph. See _target_arrays()
+_TARGET_ARRAYS = weakref.WeakKeyDictionary()
+
+# Mirror and rotation combinations tried on every window. See greedy_fit()
+SYMMETRIES = [[],
+              [('mirror',0)],
+              [('rotate',90)],
+              [('rotate',180)],
+              [('rotate',270)],
+              [('rotate',90), ('mirror',0)],
+              [('rotate',180), ('mirror',0)],
+              [('rotate',270), ('mirror',0)]]
+
+def _nice_index(nice, shape):
+    """ Index of the nice coordinates in the full-yield graph, or -1 """
+    inside = np.all((nice >= 0) & (nice < shape), axis=1)
+    index = np.full(len(nice), -1, dtype=np.int64)
+    index[inside] = np.ravel_multi_index(nice[inside].T, shape)
+    return index
+
+def _edge_bitset(a, b, size):
+    """ Packed bitset of the index pairs (a,b) in a size x size matrix """
+    key = np.minimum(a, b)*size + np.maximum(a, b)
+    bits = np.zeros((size*size+7)//8, dtype=np.uint8)
+    np.bitwise_or.at(bits, key >> 3, (128 >> (key & 7)).astype(np.uint8))
+    return bits
+
+def _has_edges(bits, a, b, size):
+    """ Whether the bitset has the index pairs (a,b). Negative indices don't """
+    key = np.minimum(a, b)*size + np.maximum(a, b)
+    key = np.where((a < 0) | (b < 0), 0, key)
+    found = (bits[key >> 3] >> (7 - (key & 7))) & 1
+    return (found == 1) & (a >= 0) & (b >= 0)
+
+def _target_arrays(T, tiling):
+    """ Shape of the nice coordinates, and the qubits and couplers of T and of
+        the full-yield graph as arrays indexed by nice coordinates. Computed
+        once per graph object, and rebuilt if the nodes or edges of the graph
+        have changed. See graph_version()
+    """
+    version = graph_version(T)
+    if T in _TARGET_ARRAYS:
+        table_version, arrays = _TARGET_ARRAYS[T]
+        if table_version is version:
+            return arrays
+
+    family = T.graph['family']
+    if family == 'chimera':
+        m, n, t = T.graph['rows'], T.graph['columns'], T.graph['tile']
+        shape = (1, m, n, 2, t)
+        ideal = dnx.chimera_graph(m, n, t, coordinates=True)
+        ideal_nice = lambda nodes: [(0,)+q for q in nodes]
+    elif family == 'pegasus':
+        m = T.graph['rows']
+        shape = (3, m-1, m-1, 2, 4)
+        ideal = dnx.pegasus_graph(m, nice_coordinates=True)
+        ideal_nice = lambda nodes: list(nodes)
+    else:
+        raise ValueError("Invalid family. {'chimera', 'pegasus'}")
+    size = int(np.prod(shape))
+
+    def bitsets(nodes, edges, to_nice):
+        index = _nice_index(np.array(to_nice(nodes), dtype=int).reshape(-1,5), shape)
+        position = {q:x for x, q in enumerate(nodes)}
+        pairs = np.array([(position[a], position[b]) for a, b in edges],
+                         dtype=int).reshape(-1,2)
+        a, b = index[pairs[:,0]], index[pairs[:,1]]
+        inside = (a >= 0) & (b >= 0)
+        node_bits = np.zeros(size, dtype=bool)
+        node_bits[index[index >= 0]] = True
+        return node_bits, _edge_bitset(a[inside], b[inside], size)
+
+    nodes, edges = bitsets(list(T), T.edges, tiling.to_nice_array)
+    _, ideal_edges = bitsets(list(ideal), ideal.edges, ideal_nice)
+    arrays = shape, nodes, edges, ideal_edges
+    _TARGET_ARRAYS[T] = (version, arrays)
+    return arrays
+
+class _ValidityChecker:
+    """ Checks if transformed copies of an embedding are valid on T, i.e. all
+        qubits are in T, every chain is connected, and there is a coupler
+        between the chains of every edge of S.
+            variables, chain_ids, nice: Flattened embedding. See _flatten()
+    """
+    def __init__(self, S, T, tiling, variables, chain_ids, nice):
+        shape, nodes, edges, ideal_edges = _target_arrays(T, tiling)
+        self.shape = shape
+        self.size = int(np.prod(shape))
+        self.nodes = nodes
+        self.edges = edges
+        self.num_qubits = len(chain_ids)
+        self.num_chains = len(np.unique(chain_ids))
+
+        # Qubits of every chain, by position in the flattened embedding
+        index = _nice_index(nice, shape)
+        offsets = np.searchsorted(chain_ids, np.arange(len(variables)+1))
+        chain = {v:np.arange(a, b) for v, a, b in zip(variables, offsets[:-1], offsets[1:])}
+        empty = np.arange(0)
+
+        def adjacent(pa, pb):
+            keep = _has_edges(ideal_edges, index[pa], index[pb], self.size)
+            return pa[keep], pb[keep]
+
+        # Qubit pairs that may couple the chains of every edge of S
+        source_edges = [(u,v) for u, v in S.edges if u != v]
+        self.num_edges = len(source_edges)
+        pa, pb, pair_edge = [empty], [empty], [empty]
+        for x, (u, v) in enumerate(source_edges):
+            a, b = np.meshgrid(chain.get(u, empty), chain.get(v, empty))
+            a, b = adjacent(a.ravel(), b.ravel())
+            pa.append(a); pb.append(b); pair_edge.append(np.full(len(a), x))
+        self.pa, self.pb = np.concatenate(pa), np.concatenate(pb)
+        self.pair_edge = np.concatenate(pair_edge)
+        # Edges without any such pair can't be represented by any copy
+        self.feasible = len(np.unique(self.pair_edge)) == self.num_edges
+
+        # Qubit pairs that may connect every chain
+        ca, cb = [empty], [empty]
+        for qubits in chain.values():
+            a, b = np.triu_indices(len(qubits), 1)
+            a, b = adjacent(qubits[a], qubits[b])
+            ca.append(a); cb.append(b)
+        self.ca, self.cb = np.concatenate(ca), np.concatenate(cb)
+
+    def is_valid(self, nice):
+        """ Stops at the first check that fails: qubits, edges, and chains """
+        if not self.feasible:
+            return False
+        index = _nice_index(nice, self.shape)
+        if (index < 0).any() or not self.nodes[index].all():
+            return False
+        found = _has_edges(self.edges, index[self.pa], index[self.pb], self.size)
+        if np.count_nonzero(np.bincount(self.pair_edge[found],
+                                        minlength=self.num_edges)) < self.num_edges:
+            return False
+        found = _has_edges(self.edges, index[self.ca], index[self.cb], self.size)
+        graph = coo_matrix((np.ones(np.count_nonzero(found)),
+                            (self.ca[found], self.cb[found])),
+                           shape=(self.num_qubits, self.num_qubits))
+        num_components, _ = connected_components(graph, directed=False)
+        return num_components == self.num_chains
+
+    def score(self, nice):
+        """ Number of faults of the transformed copy. Returns the number of
+            broken edges and chains, i.e. edges of S without a coupler between
+            their chains, plus the extra pieces of broken chains, and the
+            number of qubits missing from T.
+        """
+        index = _nice_index(nice, self.shape)
+        present = index >= 0
+        present[present] = self.nodes[index[present]]
+        missing = self.num_qubits - np.count_nonzero(present)
+        found = _has_edges(self.edges, index[self.pa], index[self.pb], self.size)
+        covered = np.count_nonzero(np.bincount(self.pair_edge[found],
+                                               minlength=self.num_edges))
+        found = _has_edges(self.edges, index[self.ca], index[self.cb], self.size)
+        graph = coo_matrix((np.ones(np.count_nonzero(found)),
+                            (self.ca[found], self.cb[found])),
+                           shape=(self.num_qubits, self.num_qubits))
+        num_components, _ = connected_components(graph, directed=False)
+        broken = (self.num_edges - covered) + (num_components - self.num_chains)
+        return int(broken), int(missing)
+
+# Checker and tiling of the worker process. See _init_window_worker()
+_WINDOW_SEARCH = None
+
+def _init_window_worker(S, T, variables, chain_ids, nice):
+    global _WINDOW_SEARCH
+    tiling = get_tiling(T)
+    checker = _ValidityChecker(S, T, tiling, variables, chain_ids, nice)
+    _WINDOW_SEARCH = (tiling, checker)
+
+def _score_window_worker(args):
+    """ Faults and tiles of every symmetry of one window """
+    index, slide = args
+    tiling, checker = _WINDOW_SEARCH
+    dim = len(tiling.shape)
+    scores = []
+    for transforms in SYMMETRIES:
+        emb = _apply_symmetry(tiling, slide, transforms)
+        tiles = emb[:,3-dim:3]
+        scores.append(checker.score(emb) + (tiles.mean(axis=0),))
+    return index, scores
+
+def _apply_symmetry(tiling, nice, transforms):
+    nice = nice.copy()
+    for name, *args in transforms:
+        nice = _TRANSFORMS[name](tiling, nice, *args)
+    return nice
+
 """ ########################### Optimize Embedding #########################
     Transformation methods to try and find a valid embedding from an invalid one
 
@@ -362,19 +569,108 @@ def iter_sliding_window(T, embedding):
             A dictionary mapping variable names to lists of labels in T
 """
 @nx_graph(0)
-def lp_chain_reduce(S, T, embedding):
-    """ TODO: Use a linear programming formulation to resolve shorter chains
-        from a given embedding.
-            1) Turn chains into shared qubits
-            2) Create LP formulation
-            3) Resolve chains
+def lp_chain_reduce(S, T, embedding, **params):
+    """ Shorten the chains of a valid embedding, minimizing the maximum chain
+        length, using the chain splitting of `embera.disperse`.
+            1) Turn chains into shared qubits: Every chain is a tree rooted
+               at its centre. For every edge (u,v) of S, the path from the
+               root of v to the root of u, through the coupler between the
+               chains closest to both roots, is a path of the disperse router.
+               Qubits on no path are removed, and qubits on more than one
+               path are kept in their chain. The other qubits are shared by
+               the source and sink of their path.
+            2) Solve the min-max assignment of the shared qubits of every
+               path to either chain. See disperse._paths_to_chains()
+            3) Resolve chains. Every chain remains connected and every edge of
+               S keeps a coupler between its chains.
+
+        The maximum chain length and the number of qubits are never larger
+        than those of the given embedding.
+
+        Optional parameters:
+            split: {'flow', 'lp'}, default='flow'
+                'flow': In-process min-max split with maximum-flow checks.
+                'lp': Linear program solved with GLPK (requires glpsol).
+
+            verbose: (int, default=0)
+                Verbosity level of the split.
+
+        Example:
+            >>> import embera
+            >>> import networkx as nx
+            >>> import dwave_networkx as dnx
+            >>> S = nx.complete_graph(11)
+            >>> T = dnx.chimera_graph(7)
+            >>> embedding = minorminer.find_embedding(S,T)
+            >>> new_embedding = embera.transform.embedding.lp_chain_reduce(S,T,embedding)
+            >>> dnx.draw_chimera_embedding(T,new_embedding,node_size=10)
     """
-    import warnings
-    warnings.warn("WIP: Not implemented yet")
-    return embedding
+    from embera.disperse import RouterOptions, _paths_to_chains
+
+    opts = RouterOptions(split=params.pop('split', 'flow'),
+                         verbose=params.pop('verbose', 0))
+    for name in params:
+        raise ValueError("%s is not a valid parameter." % name)
+
+    # Owner of every qubit, and chains as trees rooted at their centre
+    owner = {}
+    for v in S:
+        chain = embedding.get(v)
+        if not chain:
+            raise ValueError("Embedding is not valid. No chain for node %s." % v)
+        for q in chain:
+            if q in owner or q not in T:
+                raise ValueError("Embedding is not valid. Qubit %s." % (q,))
+            owner[q] = v
+    parent, depth = {}, {}
+    for v in S:
+        Tv = T.subgraph(embedding[v])
+        if not nx.is_connected(Tv):
+            raise ValueError("Embedding is not valid. Chain of %s is "
+                             "disconnected." % v)
+        root = nx.center(Tv)[0]
+        parent[root], depth[root] = None, 0
+        for a, b in nx.bfs_edges(Tv, root):
+            parent[b], depth[b] = a, depth[a] + 1
+
+    def branch(q):
+        """ Qubits from q to the root of its chain """
+        path = [q]
+        while parent[path[-1]] is not None:
+            path.append(parent[path[-1]])
+        return path
+
+    # Path of every edge of S, from the root of the sink to the root of the source
+    paths = {}
+    for u, v in S.edges:
+        if u == v: continue
+        couplers = [(depth[a] + depth[b], a, b) for a in embedding[u]
+                    for b in T[a] if owner.get(b) == v]
+        if not couplers:
+            raise ValueError("Embedding is not valid. Edge (%s, %s)." % (u, v))
+        _, a, b = min(couplers, key=lambda coupler: coupler[0])
+        paths[(u,v)] = branch(b)[::-1] + branch(a)
+
+    # Roots and qubits on more than one path stay in their chain
+    on_paths = {}
+    for path in paths.values():
+        for q in path:
+            on_paths[q] = on_paths.get(q, 0) + 1
+    mapped = {v:set() for v in S}
+    for q, count in on_paths.items():
+        if count > 1 or parent[q] is None:
+            mapped[owner[q]].add(q)
+    for v in S:
+        if not mapped[v]:
+            # Source nodes without edges keep a single qubit
+            mapped[v].add(next(q for q in embedding[v] if parent[q] is None))
+
+    mapped = _paths_to_chains(True, paths, mapped, {}, opts)
+    return {v:[q for q in embedding[v] if q in mapped[v]] +
+               [q for q in mapped[v] if owner[q] != v] for v in S}
 
 @nx_graph(0)
-def greedy_fit(S, T, embedding):
+def greedy_fit(S, T, embedding, **params):
     """ Using a sling window approach, transform the embedding from one region
         of the Chimera graph to another. This is useful when an embedding is
         done for a D-Wave machine and it's necessary to find an identical
@@ -384,7 +680,42 @@ def greedy_fit(S, T, embedding):
             1) Parse embedding and target graph to find margins.
             2) Move qubit to window i and check if nodes are available
             3) If all edges are available, return embedding, else go to 4
-            4) Test same window with 90, 180, and 270 rotations.
+            4) Test same window with the mirror, the 90, 180, and 270
+               rotations, and their mirrors. See SYMMETRIES.
+
+        An embedding is valid if all qubits are in T, every chain is
+        connected, and there is a coupler between the chains of every edge of
+        S. Returns an empty dict if no valid embedding is found.
+
+        Optional parameters:
+            top_k: (int, default=None)
+                If None, return the first valid embedding found. Otherwise,
+                every window and symmetry is scored, and a list of the top_k
+                (embedding, score) pairs is returned, best first, including
+                partial fits.
+
+            partial: (bool, default=False)
+                If no valid embedding is found, return the one with the best
+                score instead of an empty dict, e.g. to be repaired with
+                `reconnect(S,T,embedding)`.
+
+            score: {'broken', 'missing', 'distance'}, default='broken'
+                Score of a window, lower is better:
+                'broken': (broken, missing)
+                'missing': (missing, broken)
+                'distance': (broken + missing, distance)
+                Where broken is the number of edges of S without a coupler
+                between their chains, plus the extra pieces of broken chains,
+                missing is the number of qubits not in T, and distance is the
+                distance of the centre of the embedding to the region tile.
+
+            region: (tuple, default=None)
+                Tile (i,j) at the centre of the high-fidelity region of T,
+                used by score='distance'. If None, the centre of T.
+
+            num_workers: (int, default=1)
+                Number of processes used to score windows. Windows are only
+                scored if top_k is given, partial is True or num_workers > 1.
 
         Example:
             >>> import embera
@@ -397,23 +728,69 @@ def greedy_fit(S, T, embedding):
             >>> new_embedding = embera.transform.embedding.greedy_fit(S,T,embedding)
             >>> dnx.draw_chimera_embedding(T,new_embedding,node_size=10)
     """
-    interactions = lambda u,v,E:((s,t) for s in E[u] for t in E[v])
-    is_connected = lambda edges: any(T.has_edge(s,t) for s,t in edges)
-    for emb in iter_sliding_window(T,embedding):
-        if all(is_connected(interactions(u,v,emb)) for u,v in S.edges):
-            return emb
-        mir = mirror(T,emb)
-        if all(is_connected(interactions(u,v,mir)) for u,v in S.edges):
-            return mir
-        e90 = rotate(T,emb,90)
-        if all(is_connected(interactions(u,v,mir)) for u,v in S.edges):
-            return e90
-        e180 = rotate(T,emb,180)
-        if all(is_connected(interactions(u,v,mir)) for u,v in S.edges):
-            return e180
-        e270 = rotate(T,emb,270)
-        if all(is_connected(interactions(u,v,mir)) for u,v in S.edges):
-            return e270
+    top_k = params.pop('top_k', None)
+    partial = params.pop('partial', False)
+    score = params.pop('score', 'broken')
+    region = params.pop('region', None)
+    num_workers = params.pop('num_workers', 1)
+    for name in params:
+        raise ValueError("%s is not a valid parameter." % name)
+    if score not in ['broken', 'missing', 'distance']:
+        raise ValueError("score %s not valid {'broken', 'missing', 'distance'}." % score)
+
+    tiling = get_tiling(T)
+    variables, chain_ids, nice = _flatten(tiling, embedding)
+
+    # First valid embedding, stopping early
+    if top_k is None and not partial and num_workers == 1:
+        checker = _ValidityChecker(S, T, tiling, variables, chain_ids, nice)
+        if not checker.feasible:
+            return {}
+        for slide in _iter_windows(tiling, nice):
+            for transforms in SYMMETRIES:
+                emb = _apply_symmetry(tiling, slide, transforms)
+                if checker.is_valid(emb):
+                    return _rebuild(tiling, variables, chain_ids, emb)
+        return {}
+
+    # Score every window and symmetry
+    slides = list(_iter_windows(tiling, nice))
+    initargs = (S, T, variables, chain_ids, nice)
+    if num_workers > 1:
+        with multiprocessing.Pool(num_workers, _init_window_worker, initargs) as pool:
+            results = list(pool.imap_unordered(_score_window_worker, enumerate(slides)))
+    else:
+        _init_window_worker(*initargs)
+        results = [_score_window_worker(task) for task in enumerate(slides)]
+
+    if region is None:
+        region = (np.array(tiling.shape[-2:]) - 1)/2.0
+    ranked = []
+    for index, scores in results:
+        for x, (broken, missing, centre) in enumerate(scores):
+            if score == 'broken':
+                key = (broken, missing)
+            elif score == 'missing':
+                key = (missing, broken)
+            else:
+                distance = np.linalg.norm(centre[-2:] - np.array(region))
+                key = (broken + missing, float(distance))
+            # Ties are broken by the order of the sliding window
+            ranked.append((key, index, x, broken + missing))
+    ranked.sort()
+
+    def embedding_of(index, x):
+        emb = _apply_symmetry(tiling, slides[index], SYMMETRIES[x])
+        return _rebuild(tiling, variables, chain_ids, emb)
+
+    if top_k is not None:
+        return [(embedding_of(index, x), key) for key, index, x, _ in ranked[:top_k]]
+    # First valid embedding in window order, or the best partial fit
+    valid = [(index, x) for key, index, x, faults in ranked if faults == 0]
+    if valid:
+        return embedding_of(*min(valid))
+    if partial and ranked:
+        return embedding_of(*ranked[0][1:3])
     return {}
 
 def reconnect(S, T, embedding, return_overlap=False):
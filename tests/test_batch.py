@@ -0,0 +1,53 @@
+import unittest
+import networkx as nx
+import dwave_networkx as dnx
+
+from embera.preprocess import diffusion_placer, complete_bipartite_placer
+from embera.preprocess.batch import find_candidates_batch
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.T = dnx.chimera_graph(4)
+        self.sources = []
+        for size in [3, 4, 5]:
+            S = nx.grid_2d_graph(size, size)
+            S.graph['pos'] = {v:v for v in S}
+            self.sources.append(S)
+
+    def test_diffusion(self):
+        expected = [diffusion_placer.find_candidates(S, self.T, vicinity=0)
+                    for S in self.sources]
+        for num_workers in [1, 2]:
+            results = find_candidates_batch(iter(self.sources), self.T,
+                                            vicinity=0, num_workers=num_workers)
+            results = dict(results)
+            self.assertEqual([results[i] for i in range(3)], expected)
+
+    def test_bipartite(self):
+        sources = [(2,3), (4,4)]
+        results = dict(find_candidates_batch(sources, self.T, method='bipartite'))
+        for i, S in enumerate(sources):
+            expected = complete_bipartite_placer.find_candidates(S, self.T)
+            self.assertEqual(results[i], expected)
+
+    def test_interleaved(self):
+        # In-process generators don't share their target and method
+        T = dnx.chimera_graph(6)
+        sources = [(2,3), (4,4)]
+        diffusion = find_candidates_batch(self.sources[:2], self.T, vicinity=0)
+        bipartite = find_candidates_batch(sources, T, method='bipartite')
+        results = [next(diffusion), next(bipartite), next(diffusion), next(bipartite)]
+        self.assertEqual(results[0][1], diffusion_placer.find_candidates(
+                         self.sources[0], self.T, vicinity=0))
+        self.assertEqual(results[1][1], complete_bipartite_placer.find_candidates(
+                         sources[0], T))
+        self.assertEqual(results[2][1], diffusion_placer.find_candidates(
+                         self.sources[1], self.T, vicinity=0))
+        self.assertEqual(results[3][1], complete_bipartite_placer.find_candidates(
+                         sources[1], T))
+
+    def test_invalid_method(self):
+        self.assertRaises(ValueError, find_candidates_batch, self.sources,
+                          self.T, method='spring')
@@ -0,0 +1,75 @@
+import unittest
+import networkx as nx
+import dwave_networkx as dnx
+
+from embera.preprocess.complete_bipartite_placer import find_candidates, CompleteBipartitePlacer
+
+
+class TestCompleteBipartitePlacer(unittest.TestCase):
+
+    def setUp(self):
+        self.T = dnx.chimera_graph(4)
+        # Faulty coupler at row 1, column 2 and qubit of column 13
+        self.T.remove_edge(2, 5)
+        self.T.remove_node(3*32 + 3*8 + 1)
+
+    def test_find_faults(self):
+        placer = CompleteBipartitePlacer((4,4), self.T)
+        self.assertEqual(placer._find_faults((0,0), 16, 16), 1 + 4)
+        self.assertEqual(placer._find_faults((1,2), 1, 1), 1)
+        self.assertEqual(placer._find_faults((2,0), 16, 14), 4)
+        self.assertEqual(placer._find_faults((0,0), 13, 16), 1)
+
+    def test_fault_swap(self):
+        # One faulty coupler swapped for another in the same graph
+        CompleteBipartitePlacer((4,4), self.T)
+        self.T.add_edge(2, 5)
+        self.T.remove_edge(0, 4)
+        placer = CompleteBipartitePlacer((4,4), self.T)
+        self.assertEqual(placer._find_faults((1,2), 1, 1), 0)
+        self.assertEqual(placer._find_faults((0,0), 1, 1), 1)
+
+    def test_slide_window(self):
+        (P, Q), faults = find_candidates((6,8), self.T, shores=True,
+                                         show_faults=True)
+        self.assertFalse(faults)
+        self.assertEqual(len(P), 6)
+        self.assertEqual(len(Q), 8)
+
+    def test_origin(self):
+        placer = CompleteBipartitePlacer((6,8), self.T, origin=(0,0),
+                                         orientation=1)
+        (P, Q), faults = placer.run()
+        self.assertEqual(placer.origin, (0,0))
+        self.assertEqual(len(faults), 1)
+
+    def test_pegasus(self):
+        for params in [{}, {'nice_coordinates':True}]:
+            T = dnx.pegasus_graph(4, **params)
+            (P, Q), faults = find_candidates((8,6), T, shores=True,
+                                             show_faults=True)
+            self.assertFalse(faults)
+            for chain in list(P.values()) + list(Q.values()):
+                self.assertTrue(set(chain).issubset(T))
+                self.assertTrue(nx.is_connected(T.subgraph(chain)))
+            for p_chain in P.values():
+                for q_chain in Q.values():
+                    self.assertTrue(any(T.has_edge(a, b) for a in p_chain
+                                        for b in q_chain))
+
+    def test_pegasus_subgraph(self):
+        T = dnx.pegasus_graph(4)
+        placer = CompleteBipartitePlacer((8,6), T, subgraph=2)
+        placer.run()
+        self.assertEqual(placer.subgraph, 2)
+        self.assertRaises(ValueError, CompleteBipartitePlacer, (8,6), T,
+                          subgraph=3)
+
+    def test_report(self):
+        candidates, faults, report = find_candidates((6,8), self.T,
+                                                     show_faults=True,
+                                                     report=True)
+        self.assertEqual(set(report.times), {'search', 'assign'})
+        self.assertGreater(report.iterations, 0)
+        self.assertIsNone(report.subscription)
+        self.assertEqual(len(report.candidate_sizes), 14)
@@ -0,0 +1,41 @@
+import unittest
+import numpy as np
+import dwave_networkx as dnx
+
+from embera.architectures.coordinates import chimera_coordinates, pegasus_coordinates
+
+
+class TestCoordinates(unittest.TestCase):
+
+    def test_chimera_arrays(self):
+        dnx_coords = dnx.chimera_coordinates(3,5,4)
+        coords = chimera_coordinates(3,5,4)
+        nodes = list(dnx.chimera_graph(3,5,4))
+        chimera = [dnx_coords.linear_to_chimera(q) for q in nodes]
+        self.assertEqual(list(map(tuple, coords.linear_to_chimera_array(nodes).tolist())), chimera)
+        self.assertEqual(coords.chimera_to_linear_array(chimera).tolist(), nodes)
+        nice = list(coords.iter_linear_to_nice(nodes))
+        self.assertEqual(nice, [(0,)+q for q in chimera])
+        self.assertEqual(list(coords.iter_nice_to_linear(nice)), nodes)
+        self.assertEqual(list(coords.iter_nice_to_chimera(nice)), chimera)
+
+    def test_pegasus_arrays(self):
+        dnx_coords = dnx.pegasus_coordinates(4)
+        coords = pegasus_coordinates(4)
+        nodes = list(dnx.pegasus_graph(4))
+        pegasus = [dnx_coords.linear_to_pegasus(q) for q in nodes]
+        nice = [dnx_coords.linear_to_nice(q) for q in nodes]
+        self.assertEqual(list(map(tuple, coords.linear_to_pegasus_array(nodes).tolist())), pegasus)
+        self.assertEqual(coords.pegasus_to_linear_array(pegasus).tolist(), nodes)
+        self.assertEqual(list(coords.iter_linear_to_nice(nodes)), nice)
+        self.assertEqual(list(coords.iter_pegasus_to_nice(pegasus)), nice)
+        self.assertEqual(list(coords.iter_nice_to_pegasus(nice)), pegasus)
+        self.assertEqual(list(coords.iter_nice_to_linear(nice)), nodes)
+
+    def test_bound_conversions(self):
+        coords = pegasus_coordinates(4)
+        q = (1,2,7,0)
+        self.assertEqual(coords.coordinate_to_nice(q), coords.pegasus_to_nice(q))
+        self.assertEqual(coords.coordinate_to_nice_array([q]).tolist(),
+                         [list(coords.pegasus_to_nice(q))])
+        self.assertEqual(coords.linear_to_nice_array(np.array([], dtype=int)).shape, (0,5))
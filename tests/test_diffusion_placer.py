@@ -0,0 +1,100 @@
+import unittest
+import networkx as nx
+import dwave_networkx as dnx
+
+from embera.preprocess import graph_layout
+from embera.preprocess.graph_layout import find_layout
+from embera.preprocess.diffusion_placer import find_candidates, DiffusionPlacer
+
+
+class TestDiffusionPlacer(unittest.TestCase):
+
+    def setUp(self):
+        self.S = nx.grid_2d_graph(8,8)
+        self.layout = {v:v for v in self.S}
+
+    def test_chimera(self):
+        T = dnx.chimera_graph(4)
+        candidates = find_candidates(self.S.edges, T, layout=self.layout)
+        self.assertEqual(set(candidates), set(self.S))
+        for s_node, s_candidates in candidates.items():
+            self.assertTrue(s_candidates)
+            self.assertTrue(s_candidates.issubset(T))
+
+    def test_single_tile(self):
+        T = dnx.chimera_graph(4)
+        placer = DiffusionPlacer(self.S.edges, T, layout=self.layout, vicinity=0)
+        candidates = placer.run()
+        for s_node, (i,j) in placer.mapping.items():
+            self.assertEqual(candidates[s_node], set(placer.tile_qubits[(i,j)]))
+            self.assertEqual(len(candidates[s_node]), 8)
+
+    def test_concentration(self):
+        T = dnx.chimera_graph(4)
+        placer = DiffusionPlacer(self.S.edges, T, layout=self.layout,
+                                 enable_migration=False)
+        placer.run()
+        # Concentration is the number of nodes over the qubits in each tile
+        self.assertAlmostEqual(placer.concentration.sum()*8, len(self.S))
+
+    def test_layout_methods(self):
+        T = dnx.chimera_graph(4)
+        for method in ['spring', 'spectral', 'multilevel']:
+            layout = find_layout(self.S.edges, method, seed=0)
+            self.assertEqual(set(layout), set(self.S))
+            candidates = find_candidates(self.S.edges, T, layout_method=method)
+            self.assertEqual(set(candidates), set(self.S))
+
+    def test_graph_layout(self):
+        # Positions of the source graph are used if available
+        S = nx.Graph(self.S)
+        S.graph['pos'] = self.layout
+        self.assertEqual(find_layout(S), self.layout)
+
+    def test_layout_cache(self):
+        layout = find_layout(self.S.edges, 'multilevel', seed=1)
+        # Changes to a layout do not change the cached one
+        layout[(0,0)] = (-1.0,-1.0)
+        self.assertNotEqual(find_layout(self.S.edges, 'multilevel', seed=1), layout)
+        # Only the last layouts found are kept
+        for seed in range(graph_layout.LAYOUT_CACHE_SIZE + 1):
+            find_layout(self.S.edges, 'spectral', seed=seed)
+        self.assertEqual(len(graph_layout._LAYOUTS), graph_layout.LAYOUT_CACHE_SIZE)
+
+    def test_tries(self):
+        T = dnx.chimera_graph(4)
+        for score in ['overflow', 'distance']:
+            placer = DiffusionPlacer(self.S.edges, T, layout=self.layout,
+                                     score=score)
+            placer.run()
+            single = placer._score()
+            for num_workers in [1, 2]:
+                placer = DiffusionPlacer(self.S.edges, T, layout=self.layout,
+                                         tries=3, score=score, random_seed=0,
+                                         num_workers=num_workers)
+                candidates = placer.run()
+                self.assertEqual(set(candidates), set(self.S))
+                self.assertLessEqual(placer._score(), single)
+
+    def test_invalid_score(self):
+        T = dnx.chimera_graph(4)
+        self.assertRaises(ValueError, find_candidates, self.S.edges, T,
+                          layout=self.layout, score='wirelength')
+
+    def test_no_layout(self):
+        # Without a layout, candidates are found by simulated annealing
+        T = dnx.chimera_graph(4)
+        candidates = find_candidates(self.S.edges, T, random_seed=0)
+        self.assertEqual(set(candidates), set(self.S))
+
+    def test_report(self):
+        T = dnx.chimera_graph(4)
+        candidates, report = find_candidates(self.S.edges, T, layout=self.layout,
+                                             tries=2, report=True)
+        self.assertEqual(set(report.times), {'scale', 'migrate', 'assign'})
+        self.assertGreater(report.iterations, 0)
+        self.assertEqual(report.subscription.shape, (4,4))
+        # Expected qubits used, over all qubits
+        self.assertAlmostEqual(report.subscription.sum(), 64*2.5 - 128)
+        self.assertEqual(report.candidate_sizes,
+                         {v:len(c) for v, c in candidates.items()})
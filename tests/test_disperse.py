@@ -0,0 +1,195 @@
+import os
+import sys
+import json
+import random
+import unittest
+import subprocess
+import networkx as nx
+import dwave_networkx as dnx
+
+from embera import disperse
+from dwave.embedding import is_valid_embedding
+from concurrent.futures import ThreadPoolExecutor
+
+# Router runs with string source labels, printed as sorted JSON
+HASH_SEED_SCRIPT = """
+import sys, json, networkx as nx, dwave_networkx as dnx
+from embera import disperse
+params_list = json.loads(sys.argv[1])
+T = dnx.chimera_graph(4)
+G = nx.grid_2d_graph(4,4)
+G.add_edges_from([((0,0),(1,1)),((1,1),(2,2)),((2,1),(1,2)),((3,0),(2,1)),((0,3),(1,2))])
+S = nx.relabel_nodes(G, lambda v: 'n%d%d' % v)
+candidates = {'n%d%d' % (i,j):[q for q in T if abs(q//32-i)<=1 and abs((q//8)%4-j)<=1]
+              for (i,j) in G}
+results = []
+for params, seed in ((params, seed) for params in params_list for seed in range(3)):
+    try:
+        embedding = disperse.find_embedding(S.edges, T, candidates, random_seed=seed,
+                                            tries=20, **params)
+    except RuntimeError:
+        results.append(None)
+        continue
+    results.append(sorted((v, sorted(chain)) for v, chain in embedding.items()))
+print(json.dumps(results))
+"""
+
+def run_with_hash_seed(hash_seed, params_list):
+    """ Output of HASH_SEED_SCRIPT in a new process with PYTHONHASHSEED set,
+    for every set of router parameters in params_list.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONHASHSEED=str(hash_seed), PYTHONPATH=root)
+    output = subprocess.check_output([sys.executable, '-W', 'ignore', '-c',
+                                      HASH_SEED_SCRIPT, json.dumps(params_list)],
+                                     env=env, cwd=root)
+    return json.loads(output)
+
+class TestDisperse(unittest.TestCase):
+
+    def setUp(self):
+        self.S = nx.grid_2d_graph(3,3)
+        self.T = dnx.chimera_graph(4)
+        # Each source node can use any qubit of its unit cell
+        self.candidates = {(i,j):[q for q in self.T if q//32==i and (q//8)%4==j]
+                           for (i,j) in self.S}
+
+    def test_split_paths(self):
+        # Paths share target nodes 1..4 and 6..7 between three source nodes
+        mapped = {'a':{0}, 'b':{5}, 'c':{8,9,10}}
+        paths = {('a','b'):[5,4,3,2,1,0], ('b','c'):[8,7,6,5]}
+        opts = disperse.RouterOptions()
+        num_sink = disperse._split_paths(paths, mapped, opts)
+        disperse._assign_nodes(paths, num_sink, mapped)
+        self.assertEqual(max(len(chain) for chain in mapped.values()), 4)
+        self.assertEqual(set().union(*mapped.values()), set(range(11)))
+
+    def test_invalid_split(self):
+        self.assertRaises(ValueError, disperse._paths_to_chains, True, {}, {}, {},
+                          disperse.RouterOptions(split='glpk'))
+
+    def test_find_embedding(self):
+        for params in [{'rip_all':True},
+                       {'rip_all':True, 'engine':'array'},
+                       {'incremental':True, 'steiner':'multi'},
+                       {'incremental':True, 'steiner':'astar', 'radius':1}]:
+            embedding = disperse.find_embedding(self.S.edges, self.T,
+                                                self.candidates, random_seed=0,
+                                                **params)
+            self.assertTrue(is_valid_embedding(embedding, self.S, self.T))
+
+    def test_multi_rip_up(self):
+        # Conflicts ripped up and rerouted over several tries
+        S = self.S.copy()
+        S.add_edges_from(((i,j),(i+1,j+1)) for i in range(2) for j in range(2))
+        S.add_edges_from(((i+1,j),(i,j+1)) for i in range(2) for j in range(2))
+        for engine in ['networkx', 'array']:
+            embedding = disperse.find_embedding(S.edges, self.T, self.candidates,
+                                                steiner='multi', engine=engine,
+                                                tries=10, profile=True,
+                                                random_seed=0)
+            self.assertTrue(is_valid_embedding(embedding, S, self.T))
+            self.assertGreaterEqual(len(embedding.properties['stats'].tries), 2)
+
+    def test_pruned_target(self):
+        # Paths between other source nodes crossing the same target node
+        # aren't legal
+        T = self.T.copy()
+        T.remove_nodes_from(random.Random(8).sample(sorted(T), 8))
+        S = nx.grid_2d_graph(4,4)
+        S.add_edges_from(((i,j),(i+1,j+1)) for i in range(3) for j in range(3))
+        candidates = {(i,j):[q for q in T if q//32==i and (q//8)%4==j]
+                      for (i,j) in S}
+        for params, seed in [({}, 0), ({}, 1), ({'steiner':'multi'}, 0)]:
+            embedding = disperse.find_embedding(S.edges, T, candidates,
+                                                tries=30, random_seed=seed,
+                                                **params)
+            self.assertTrue(is_valid_embedding(embedding, S, T))
+
+    def test_router_state(self):
+        # Runs in the same process, or in threads, don't share cost scalers
+        S = self.S.copy()
+        S.add_edges_from(((i,j),(i+1,j+1)) for i in range(2) for j in range(2))
+        def run(engine):
+            embedding = disperse.find_embedding(S.edges, self.T, self.candidates,
+                                                engine=engine, tries=10,
+                                                profile=True, random_seed=0)
+            stats = embedding.properties['stats']
+            return (dict(embedding), stats.conflicts, stats.expanded,
+                    stats.pushes, stats.pops)
+        for engine in ['networkx', 'array']:
+            first = run(engine)
+            self.assertGreaterEqual(len(first[1]), 2)
+            self.assertEqual(run(engine), first)
+            with ThreadPoolExecutor(4) as executor:
+                for result in executor.map(run, [engine]*4):
+                    self.assertEqual(result, first)
+
+    def test_multi_start(self):
+        # Same seed, same embedding, whichever worker finishes first
+        for params in [{}, {'first_legal':True}]:
+            embeddings = [disperse.find_embedding(self.S.edges, self.T,
+                                                  self.candidates, num_workers=3,
+                                                  incremental=True, random_seed=4,
+                                                  **params)
+                          for _ in range(2)]
+            self.assertTrue(is_valid_embedding(embeddings[0], self.S, self.T))
+            self.assertEqual(*embeddings)
+
+    def test_random_seed(self):
+        for order in ['random', 'degree', 'bfs']:
+            embeddings = [disperse.find_embedding(self.S.edges, self.T.edges,
+                                                  self.candidates, order=order,
+                                                  incremental=True, random_seed=5)
+                          for _ in range(2)]
+            self.assertEqual(*embeddings)
+
+    def test_invalid_order(self):
+        self.assertRaises(ValueError, disperse.find_embedding, self.S.edges,
+                          self.T.edges, self.candidates, order='dfs')
+
+    def test_astar_edgelist(self):
+        # Tile bounds require the dwave_networkx graph attributes
+        self.assertRaises(ValueError, disperse.find_embedding, self.S.edges,
+                          self.T.edges, self.candidates, steiner='astar')
+
+    def test_profile(self):
+        embedding = disperse.find_embedding(self.S.edges, self.T.edges,
+                                            self.candidates, incremental=True,
+                                            steiner='multi', profile=True,
+                                            random_seed=0)
+        stats = embedding.properties['stats']
+        self.assertEqual(len(stats.tries), len(stats.conflicts))
+        self.assertEqual(stats.conflicts[-1], 0)
+        for u, v in stats.expanded:
+            self.assertTrue(self.S.has_edge(u,v))
+        self.assertGreaterEqual(stats.pushes, stats.pops)
+
+    def test_warm_start(self):
+        embedding = disperse.find_embedding(self.S.edges, self.T.edges,
+                                            self.candidates, incremental=True,
+                                            random_seed=0)
+        # Remove one qubit of every chain of the prior embedding
+        T = self.T.copy()
+        T.remove_nodes_from(min(chain) for chain in embedding.values())
+        repaired = disperse.find_embedding(self.S.edges, T.edges,
+                                           self.candidates, warm_start=embedding,
+                                           profile=True, random_seed=0)
+        self.assertTrue(is_valid_embedding(repaired, self.S, T))
+        # Edges with couplers between the remaining chains aren't rerouted
+        stats = repaired.properties['stats']
+        self.assertLess(len(stats.expanded), self.S.number_of_edges())
+
+    def test_hash_seed(self):
+        # Same seed, same embedding, in processes with different hash seeds
+        params_list = [dict(params, order=order)
+                       for order in ['random', 'degree', 'bfs']
+                       for params in [{}, {'rip_all':True}, {'incremental':True}]]
+        params_list += [{'incremental':True, 'steiner':'multi'},
+                        {'incremental':True, 'engine':'array'}]
+        results = zip(run_with_hash_seed(1, params_list),
+                      run_with_hash_seed(2, params_list))
+        # Three seeds per set of parameters
+        for x, (result_1, result_2) in enumerate(results):
+            with self.subTest(params=params_list[x//3], seed=x%3):
+                self.assertEqual(result_1, result_2)
@@ -0,0 +1,62 @@
+import unittest
+import networkx as nx
+import dwave_networkx as dnx
+
+from embera.preprocess.simulated_annealing_placer import find_candidates, SimulatedAnnealingPlacer
+
+
+class TestSimulatedAnnealingPlacer(unittest.TestCase):
+
+    def setUp(self):
+        self.S = nx.grid_2d_graph(8,8)
+
+    def test_chimera(self):
+        T = dnx.chimera_graph(4)
+        candidates = find_candidates(self.S.edges, T, random_seed=0)
+        self.assertEqual(set(candidates), set(self.S))
+        for s_node, s_candidates in candidates.items():
+            self.assertTrue(s_candidates)
+            self.assertTrue(s_candidates.issubset(T))
+
+    def test_pegasus(self):
+        T = dnx.pegasus_graph(4)
+        candidates = find_candidates(self.S.edges, T, random_seed=0, vicinity=2)
+        self.assertEqual(set(candidates), set(self.S))
+
+    def test_single_tile(self):
+        T = dnx.chimera_graph(4)
+        placer = SimulatedAnnealingPlacer(self.S.edges, T, vicinity=0,
+                                          random_seed=0)
+        candidates = placer.run()
+        for s_node, (i,j) in placer.mapping.items():
+            self.assertEqual(candidates[s_node], set(placer.tile_qubits[(i,j)]))
+
+    def test_incremental_cost(self):
+        T = dnx.chimera_graph(4)
+        for cooling in ['adaptive', 0.8]:
+            placer = SimulatedAnnealingPlacer(self.S.edges, T, cooling=cooling,
+                                              random_seed=0)
+            cost = placer._anneal(placer.rng)
+            wirelength, overflow = placer._cost()
+            self.assertAlmostEqual(cost, wirelength + 2.0*overflow)
+
+    def test_random_seed(self):
+        T = dnx.chimera_graph(4)
+        candidates = [find_candidates(self.S.edges, T, tries=2, random_seed=5)
+                      for _ in range(2)]
+        self.assertEqual(*candidates)
+
+    def test_invalid_cooling(self):
+        T = dnx.chimera_graph(4)
+        self.assertRaises(ValueError, find_candidates, self.S.edges, T,
+                          cooling=1.5)
+
+    def test_report(self):
+        T = dnx.chimera_graph(4)
+        candidates, report = find_candidates(self.S.edges, T, random_seed=0,
+                                             report=True)
+        self.assertEqual(set(report.times), {'anneal', 'assign'})
+        self.assertGreater(report.iterations, 0)
+        self.assertAlmostEqual(report.subscription.sum(), 64*2.5 - 128)
+        self.assertEqual(report.min_candidates,
+                         min(len(c) for c in candidates.values()))
@@ -1,7 +1,9 @@
+import gc
+import weakref
 import unittest
 import dwave_networkx as dnx
 
-from embera.preprocess.tiling_parser import DWaveNetworkXTiling
+from embera.preprocess.tiling_parser import DWaveNetworkXTiling, get_tiling
 
 
 class TestTilingParser(unittest.TestCase):
@@ -24,3 +26,48 @@ class TestTilingParser(unittest.TestCase):
         self.assertEqual(linear_tiling.get_tile(10),
                          coord_tiling.get_tile((0,0,10,0)),
                          nice_tiling.get_tile((1,0,0,0,2)))
+
+    def test_table(self):
+        T = dnx.chimera_graph(3)
+        tiling = DWaveNetworkXTiling(T)
+        table = tiling.table
+        # Table is shared by tilings of the same graph
+        self.assertIs(DWaveNetworkXTiling(T).table, table)
+        self.assertEqual(list(table.supply), [8]*9)
+        for k, tile in enumerate(table.tiles):
+            self.assertEqual(set(table.tile_qubits[k]), set(tiling[tile].qubits))
+        # N, S, W, E, NW, NE, SE, SW of the centre and corner tiles
+        self.assertEqual(tiling[(1,1)].neighbors,
+                         [(0,1), (2,1), (1,0), (1,2), (0,0), (0,2), (2,2), (2,0)])
+        self.assertEqual(tiling[(0,0)].neighbors,
+                         [None, (1,0), None, (0,1), None, None, (1,1), None])
+        self.assertEqual(sorted(tiling.get_tile_neighbors((0,0))), [(0,1), (1,0)])
+        # Table is rebuilt if the graph changes
+        T.remove_nodes_from(range(8))
+        table = DWaveNetworkXTiling(T).table
+        self.assertNotIn((0,0), table.tiles)
+        # Also if a qubit is replaced by another, with the same number of nodes
+        T.remove_node(8)
+        T.add_node(0)
+        table = DWaveNetworkXTiling(T).table
+        self.assertIn((0,0), table.tiles)
+        self.assertNotIn(8, table.qubit_index)
+
+    def test_get_tiling(self):
+        # Tiling is built once per graph
+        T = dnx.chimera_graph(2)
+        tiling = get_tiling(T)
+        self.assertIs(get_tiling(T), tiling)
+        self.assertIsNot(get_tiling(dnx.chimera_graph(2)), tiling)
+        # Rebuilt if a coupler is swapped for another
+        T.remove_edge(0,4)
+        T.add_edge(0,1)
+        faulty = get_tiling(T)
+        self.assertIsNot(faulty, tiling)
+        self.assertNotIn((0,4), faulty.couplers)
+        self.assertIn((0,4), tiling.couplers)
+        self.assertIs(get_tiling(T), faulty)
+        # Tilings don't keep the graph alive
+        T = weakref.ref(T)
+        gc.collect()
+        self.assertIsNone(T())
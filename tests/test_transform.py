@@ -53,3 +53,104 @@ class TestTransformEmbedding(unittest.TestCase):
         embedding_r = embera.transform.embedding.open_seam(T,embedding,2,'right')
         embedding_u = embera.transform.embedding.open_seam(T,embedding,2,'up')
         embedding_d = embera.transform.embedding.open_seam(T,embedding,2,'down')
+
+    def test_compose_transforms(self):
+        T = self.T
+        embedding = self.embedding
+        transforms = [('rotate',90), ('mirror',1), ('translate',(1,2))]
+        composed = embera.transform.embedding.compose_transforms(T,embedding,transforms)
+        sequential = embedding
+        sequential = embera.transform.embedding.rotate(T,sequential,90)
+        sequential = embera.transform.embedding.mirror(T,sequential,1)
+        sequential = embera.transform.embedding.translate(T,sequential,(1,2))
+        self.assertEqual(composed, sequential)
+        # Rotating four times is the identity
+        identity = embera.transform.embedding.compose_transforms(T,embedding,[('rotate',90)]*4)
+        self.assertEqual(identity, {v:list(chain) for v,chain in embedding.items()})
+        self.assertRaises(ValueError, embera.transform.embedding.compose_transforms,
+                          T, embedding, [('shear',1)])
+
+    def test_greedy_fit_valid(self):
+        S = nx.complete_graph(6)
+        C = dnx.chimera_graph(3,coordinates=True)
+        embedding = minorminer.find_embedding(S,C,random_seed=2)
+        # Qubits of the first row of tiles are missing
+        T = dnx.chimera_graph(8,coordinates=True)
+        T.remove_nodes_from([q for q in T if q[0]==0])
+        new_embedding = embera.transform.embedding.greedy_fit(S,T,embedding)
+        self.assertTrue(new_embedding)
+        for u,v in S.edges:
+            self.assertTrue(any(T.has_edge(s,t) for s in new_embedding[u]
+                                for t in new_embedding[v]))
+        for chain in new_embedding.values():
+            self.assertTrue(nx.is_connected(T.subgraph(chain)))
+        # No fit if a source edge can't be represented
+        S.add_edge(0,'x')
+        self.assertEqual(embera.transform.embedding.greedy_fit(S,T,embedding), {})
+
+    def test_greedy_fit_yield_change(self):
+        S = nx.complete_graph(6)
+        C = dnx.chimera_graph(3,coordinates=True)
+        embedding = minorminer.find_embedding(S,C,random_seed=2)
+        T = dnx.chimera_graph(8,coordinates=True)
+        fit = embera.transform.embedding.greedy_fit(S,T,embedding)
+        # Same graph and number of couplers, without those used by the fit
+        qubits = set().union(*fit.values())
+        used = set(T.subgraph(qubits).edges)
+        T.remove_edges_from(used)
+        unrelated = [((i,j,0,k),(i,j,0,k+1)) for i in range(8) for j in range(8)
+                     for k in range(3)]
+        T.add_edges_from(unrelated[:len(used)])
+        new_fit = embera.transform.embedding.greedy_fit(S,T,embedding)
+        self.assertTrue(new_fit)
+        for u,v in S.edges:
+            self.assertTrue(any(T.has_edge(s,t) for s in new_fit[u]
+                                for t in new_fit[v]))
+        for chain in new_fit.values():
+            self.assertTrue(nx.is_connected(T.subgraph(chain)))
+
+    def test_greedy_fit_ranked(self):
+        S = nx.complete_graph(6)
+        C = dnx.chimera_graph(3,coordinates=True)
+        embedding = minorminer.find_embedding(S,C,random_seed=2)
+        T = dnx.chimera_graph(6,coordinates=True)
+        T.remove_nodes_from([q for q in T if q[0]==0])
+        ranked = embera.transform.embedding.greedy_fit(S,T,embedding,top_k=4)
+        self.assertEqual(len(ranked), 4)
+        scores = [score for _, score in ranked]
+        self.assertEqual(scores, sorted(scores))
+        self.assertEqual(scores[0], (0,0))
+        # Scored search finds the same first fit
+        self.assertEqual(embera.transform.embedding.greedy_fit(S,T,embedding,num_workers=2),
+                         embera.transform.embedding.greedy_fit(S,T,embedding))
+        # Best partial fit if there is no valid one
+        T.remove_nodes_from([q for q in T if q[1]%2])
+        self.assertEqual(embera.transform.embedding.greedy_fit(S,T,embedding), {})
+        partial = embera.transform.embedding.greedy_fit(S,T,embedding,partial=True)
+        self.assertEqual(set(partial), set(S))
+        self.assertRaises(ValueError, embera.transform.embedding.greedy_fit,
+                          S, T, embedding, score='fidelity')
+
+    def test_lp_chain_reduce(self):
+        S = self.S
+        T = self.T
+        embedding = minorminer.find_embedding(S,T,random_seed=1,tries=1,
+                                              chainlength_patience=0)
+        new_embedding = embera.transform.embedding.lp_chain_reduce(S,T,embedding)
+        self.assertEqual(set(new_embedding), set(S))
+        for chain in new_embedding.values():
+            self.assertTrue(nx.is_connected(T.subgraph(chain)))
+        for u,v in S.edges:
+            self.assertTrue(any(T.has_edge(s,t) for s in new_embedding[u]
+                                for t in new_embedding[v]))
+        qubits = [q for chain in new_embedding.values() for q in chain]
+        self.assertEqual(len(qubits), len(set(qubits)))
+        self.assertLessEqual(max(map(len,new_embedding.values())),
+                             max(map(len,embedding.values())))
+        self.assertLessEqual(len(qubits), sum(map(len,embedding.values())))
+        # Chains must be connected
+        broken = dict(embedding)
+        used = {q for chain in embedding.values() for q in chain}
+        broken[0] = list(broken[0]) + [q for q in T if q not in used][-1:]
+        self.assertRaises(ValueError, embera.transform.embedding.lp_chain_reduce,
+                          S, T, broken)